@@ -1,6 +1,7 @@
 
 import os
 from app.bot import Bot
+from app.supervisor import Supervisor
 from app.logger import setup_logger
 
 def main():
@@ -15,9 +16,16 @@ def main():
 
     translate_api_url = os.getenv('TRANSLATE_API_URL', '')
 
+    mode = os.getenv('BOT_MODE', 'polling')
     try:
+        if mode == 'sharded':
+            Supervisor(token, db_path=db_path, translate_api_url=translate_api_url).run()
+            return
         bot = Bot(token, db_path=db_path, translate_api_url=translate_api_url)
-        bot.run()
+        if mode == 'webhook':
+            bot.run_webhook()
+        else:
+            bot.run()
     except Exception as e:
         logger.error(f"Error running bot: {str(e)}", exc_info=True)
 
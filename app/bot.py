@@ -1,5 +1,7 @@
+import os
 from app.handlers.reaction import ReactionHandler
 from app.handlers.text import TextHandler
+from app.handlers.detectors import DetectorRegistry, LaughDetector
 from app.handlers.photo import PhotoHandler
 from app.handlers.voice_handler import VoiceHandler
 from app.handlers.voice import VoiceMessageHandler
@@ -10,9 +12,20 @@ from app.commands.translate import Translate
 from app.commands.help import Help
 from app.commands.model import Model
 from app.commands.tts import TTS
+from app.commands.stt import STT
 from app.commands.history import History
+from app.commands.summary import Summary
+from app.commands.stats import Stats
+from app.commands.enrich import Enrich
 from app.logger import setup_logger
 from app.database import DatabaseHandler
+from app.services.message_index import MessageIndex
+from app.services.http import HTTPSessionManager
+from app.services.media_store import MediaStore
+from app.services.media_storage_manager import MediaStorageManager
+from app.services.enrichment import MediaEnricher
+from app.webhook import WebhookServer
+from app.dispatcher import ChatDispatcher
 from app.brain.factory import get_brain_handler, available_backends
 from app.handlers.tts import TTSHandler
 from app.handlers.translate import TranslateHandler
@@ -22,33 +35,63 @@ class Bot:
     def __init__(self, token: str, db_path: str = 'database/messages.db', translate_api_url: str = ''):
         self.logger = setup_logger()
         self.logger.info("Bot is running with detailed logging enabled.")
-        self.application = Application.builder().token(token).build()
+        builder = Application.builder().token(token).post_init(self._post_init).post_shutdown(self._post_shutdown)
+        if os.getenv('TELEGRAM_API_URL'):
+            builder = builder.base_url(f"{os.getenv('TELEGRAM_API_URL').rstrip('/')}/bot")
+        self.application = builder.build()
+        # Background media quota and recompression jobs; with several worker processes only one runs them
+        self.maintenance = True
         self.db = DatabaseHandler(db_path)
+        self.index = MessageIndex(
+            os.getenv('INDEX_DIR', 'database/index'),
+            capacity=int(os.getenv('INDEX_MAX_MESSAGES', '5000')),
+            db=self.db,
+        )
+        self.db.add_store_listener(self.index.add)
+        # Outbound HTTP sessions shared by all services, closed at shutdown
+        self.http = HTTPSessionManager()
+        self.media = MediaStore(self.db, os.getenv('MEDIA_DIR', 'files'), lazy=os.getenv('MEDIA_LAZY_DOWNLOAD', 'off') == 'on', http=self.http)
+        self.storage_manager = MediaStorageManager(self.db, self.media)
         self.brain = {}
         self.tts = TTSHandler()
-        self.voice = VoiceHandler()
+        self.voice = VoiceHandler(self.db)
+        self.enricher = MediaEnricher(self)
         if translate_api_url == '':
             self.logger.debug("No translation API URL provided.")
             self.translator = None
         else:
             self.logger.info(f"Translation API URL set to: {translate_api_url}")
-            self.translator = TranslateHandler(translate_api_url)
+            self.translator = TranslateHandler(translate_api_url, http=self.http)
 
-        self.application.add_handler(TGMessageHandler(filters.TEXT & ~filters.COMMAND & ~filters.REPLY, TextHandler(self), block=False))
-        self.application.add_handler(TGMessageHandler(filters.PHOTO, PhotoHandler(self), block=False))
-        self.application.add_handler(TGMessageHandler(filters.VOICE, VoiceMessageHandler(self), block=False))
-        self.application.add_handler(TGMessageHandler(filters.REPLY, ReplyHandler(self), block=False))
+        self.detectors = DetectorRegistry(self)
+        self.detectors.register(LaughDetector(self))
 
-        self.application.add_handler(CommandHandler("b", Bee(self)))
+        # Handlers that call backends are queued per chat and run on a bounded worker pool
+        self.dispatcher = ChatDispatcher(self)
+        dispatch = self.dispatcher.wrap
+        # Plain text is stored inline; it only queues the replies it may lead to
+        self.application.add_handler(TGMessageHandler(filters.TEXT & ~filters.COMMAND & ~filters.REPLY, TextHandler(self)))
+        photo_handler = PhotoHandler(self)
+        # Album photos are counted on arrival, in an earlier handler group, before they are queued
+        self.application.add_handler(TGMessageHandler(filters.PHOTO, photo_handler.expect), group=-1)
+        self.application.add_handler(TGMessageHandler(filters.PHOTO, dispatch(photo_handler, on_shed=photo_handler.discard)))
+        self.application.add_handler(TGMessageHandler(filters.VOICE, dispatch(VoiceMessageHandler(self))))
+        self.application.add_handler(TGMessageHandler(filters.REPLY, dispatch(ReplyHandler(self))))
+
+        self.application.add_handler(CommandHandler("b", dispatch(Bee(self))))
         self.application.add_handler(CommandHandler("context", Context(self)))
         self.application.add_handler(CommandHandler("help", Help(self)))
         self.application.add_handler(CommandHandler("model", Model(self)))
         self.application.add_handler(CommandHandler("start", Help(self)))
         self.application.add_handler(CommandHandler("tts", TTS(self)))
+        self.application.add_handler(CommandHandler("stt", STT(self)))
         self.application.add_handler(CommandHandler("translate", Translate(self)))
         self.application.add_handler(CommandHandler("history", History(self)))
+        self.application.add_handler(CommandHandler("summary", dispatch(Summary(self))))
+        self.application.add_handler(CommandHandler("stats", Stats(self)))
+        self.application.add_handler(CommandHandler("enrich", Enrich(self)))
 
-        self.application.add_handler(MessageReactionHandler(ReactionHandler(self)))
+        self.application.add_handler(MessageReactionHandler(dispatch(ReactionHandler(self))))
 
     def get_brain(self, chat_id: int):
         if chat_id not in self.brain:
@@ -62,7 +105,26 @@ class Bot:
         self.logger.debug(f"Checking translation setting for chat {chat_id} was {translate}")
         return translate == "on"
 
+    async def _post_init(self, application: Application):
+        if self.maintenance:
+            self.storage_manager.start()
+        self.enricher.start()
+        self.dispatcher.start()
+        self.detectors.start()
+
+    async def _post_shutdown(self, application: Application):
+        await self.dispatcher.stop()
+        await self.detectors.stop()
+        await self.enricher.stop()
+        await self.storage_manager.stop()
+        await self.http.close()
+        self.index.close()
+
     def run(self):
         self.logger.info("Bot is starting...")
         self.application.run_polling()
 
+    def run_webhook(self):
+        self.logger.info("Bot is starting in webhook mode...")
+        WebhookServer(self.application).run()
+
@@ -1,2 +1,4 @@
 from .factory import get_brain_handler
 
+# Brains answer errors with an apology instead of raising; never cache those
+ERROR_PREFIXES = ("I apologize", "I encountered", "[NOOP]")
@@ -4,6 +4,7 @@ from app.logger import setup_logger
 
 class DeepseekBrainHandler:
     AVAILABLE_MODELS = ["deepseek-chat"]
+    MAX_CONCURRENCY = 2  # parallel requests allowed by fan-out callers such as /summary
 
     def __init__(self, model_name: str = "deepseek-chat"):
         self.logger = setup_logger()
@@ -28,7 +29,7 @@ class DeepseekBrainHandler:
         else:
             raise ValueError(f"Invalid model name: {model_name}")
 
-    def process(self, prompt, recent_messages=None, system_prompt=""):
+    def process(self, prompt, recent_messages=None, system_prompt="", deadline=None):
         # Only text for now
         url = "https://api.deepseek.com/v1/chat/completions"
         headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
@@ -45,7 +46,8 @@ class DeepseekBrainHandler:
             "temperature": 0.7
         }
         try:
-            resp = requests.post(url, headers=headers, json=data, timeout=30)
+            timeout = max(0.1, min(30, deadline.remaining())) if deadline else 30
+            resp = requests.post(url, headers=headers, json=data, timeout=timeout)
             resp.raise_for_status()
             result = resp.json()
             return result['choices'][0]['message']['content']
@@ -53,7 +55,9 @@ class DeepseekBrainHandler:
             self.logger.error(f"Deepseek API error: {str(e)}")
             return "I apologize, but I encountered an error processing your request."
 
-    async def process_image(self, image_bytes: bytearray, caption: str, system_prompt: str = "") -> str:
+    async def process_image(self, image_bytes: bytearray, caption: str, system_prompt: str = "", deadline=None) -> str:
         self.logger.error(f"tried to process image with deepseek")
         return "I apologize, image processing is not supported with Deepseek yet."
 
+    async def process_images(self, images: list[bytearray], caption: str, system_prompt: str = "", deadline=None) -> str:
+        return await self.process_image(images[0], caption, system_prompt, deadline=deadline)
@@ -5,14 +5,26 @@ from PIL import Image
 import io
 
 from app.logger import setup_logger
+from app.brain.image_preprocessing import preprocess_images
 # The most reliable way to import both classes is from the types submodule.
 
+_shared_client = None
+
+def get_client() -> genai.Client:
+    """The google.genai client (and its connection pool) shared by every Gemini caller"""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = genai.Client()
+    return _shared_client
+
 class GeminiBrainHandler:
     AVAILABLE_MODELS = {
         1: 'gemini-2.5-pro',
         2: 'gemini-2.5-flash',
         3: 'gemini-2.5-flash-lite'
     }
+    MAX_CONCURRENCY = 4  # parallel requests allowed by fan-out callers such as /summary
+    IMAGE_MAX_SIDE = 1280  # larger images are only split into more 768px tiles
 
     def __init__(self, model: int | str = 2):
         self.logger = setup_logger()
@@ -41,7 +53,8 @@ class GeminiBrainHandler:
         # This tells the Gemini model that it has access to a web search tool.
         self.google_search_tool = genai.types.Tool(google_search=genai.types.GoogleSearch())
 
-        client = genai.Client()
+        client = get_client()
+        self.client = client
         grounding_tool = types.Tool(
             google_search=types.GoogleSearch()
         )
@@ -67,21 +80,32 @@ class GeminiBrainHandler:
         else:
             raise ValueError(f"Invalid model name: {model_name}")
 
-    def process(self, prompt, recent_messages=None, system_prompt=""):
+    def process(self, prompt, recent_messages=None, system_prompt="", deadline=None):
         self.logger.info("Processing text prompt.")
 
         context = self._format_context(recent_messages) if recent_messages else ""
         full_prompt = self._format_prompt(prompt, context, system_prompt)
         self._log_prompt(full_prompt)
-        return self._generate_content(full_prompt)
+        return self._generate_content(full_prompt, deadline=deadline)
 
-    async def process_image(self, image_bytes: bytearray, caption: str, system_prompt: str = "") -> str:
-        contents = [
-            types.Part.from_text(text=self._format_image_prompt(caption, system_prompt)),
-            types.Part.from_bytes(data=image_bytes, mime_type="image/jpeg")
-        ]
-        self._log_prompt(contents)
-        return self._generate_content(contents, image_mode=True)
+    async def process_image(self, image_bytes: bytearray, caption: str, system_prompt: str = "", deadline=None) -> str:
+        return await self.process_images([image_bytes], caption, system_prompt, deadline=deadline)
+
+    async def process_images(self, images: list[bytearray], caption: str, system_prompt: str = "", deadline=None) -> str:
+        try:
+            # Missing or undecodable images fail here and get the image error reply too
+            images = await preprocess_images(images, self.IMAGE_MAX_SIDE)
+            contents = [types.Part.from_text(text=self._format_image_prompt(caption, system_prompt, len(images)))]
+            contents += [types.Part.from_bytes(data=image, mime_type="image/jpeg") for image in images]
+            self._log_prompt(contents)
+            response = await self.client.aio.models.generate_content(
+                model=self.model_name,
+                contents=contents,
+                config=self._config_for(deadline)
+            )
+            return self._format_response(response, image_mode=True)
+        except Exception as e:
+            return self._error_reply(e, image_mode=True)
 
     def _format_context(self, messages):
         if not messages:
@@ -100,8 +124,9 @@ class GeminiBrainHandler:
     def _format_prompt(self, prompt, context, system_prompt):
         return f"{system_prompt}\n{context}\nUser query: {prompt}\nPlease provide a concise and relevant response."
 
-    def _format_image_prompt(self, caption, system_prompt):
-        return f"{system_prompt}Please analyze this image{' and respond to: ' + caption if caption else '.'}\nProvide a clear and concise response."
+    def _format_image_prompt(self, caption, system_prompt, count=1):
+        subject = "this image" if count == 1 else f"these {count} images"
+        return f"{system_prompt}Please analyze {subject}{' and respond to: ' + caption if caption else '.'}\nProvide a clear and concise response."
 
     def _log_prompt(self, prompt):
         self.logger.info(f"Using model: {self.model_name}")
@@ -109,56 +134,67 @@ class GeminiBrainHandler:
         self.logger.info(prompt)
         self.logger.info("---END PROMPT---")
 
-    def _generate_content(self, prompt, image_mode=False):
+    def _config_for(self, deadline):
+        """Bound the request by the remaining update deadline, if any"""
+        if deadline is None:
+            return self.config
+        timeout_ms = max(1, int(deadline.remaining() * 1000))
+        return self.config.model_copy(update={'http_options': types.HttpOptions(timeout=timeout_ms)})
+
+    def _generate_content(self, prompt, image_mode=False, deadline=None):
         try:
             response = self.model.generate_content(
                 model=self.model_name,
                 contents=prompt,
-                config=self.config
+                config=self._config_for(deadline)
             )
+            return self._format_response(response, image_mode)
+        except Exception as e:
+            return self._error_reply(e, image_mode)
 
-            if not response.candidates:
-                return "I apologize, but I cannot provide a response to that query due to safety constraints." if not image_mode else "I apologize, but I cannot analyze this image due to safety constraints."
-
-            # Check for grounding metadata and log the sources.
-            # This is a key step for transparency and debugging.
-            text = response.text
-
-            supports = []
-            chunks = []
-
-            if response.candidates[0].grounding_metadata and response.candidates[0].grounding_metadata.grounding_supports:
-                supports = response.candidates[0].grounding_metadata.grounding_supports
-
-            if response.candidates[0].grounding_metadata and response.candidates[0].grounding_metadata.grounding_chunks:
-                chunks = response.candidates[0].grounding_metadata.grounding_chunks
-
-            sorted_supports = sorted(supports, key=lambda s: s.segment.end_index, reverse=True)
-
-            # Collect all unique citations in order of first appearance
-            citation_map = {}
-            citation_counter = 1
-            for support in sorted_supports:
-                if support.grounding_chunk_indices:
-                    for i in support.grounding_chunk_indices:
-                        if i < len(chunks) and i not in citation_map:
-                            citation_map[i] = citation_counter
-                            citation_counter += 1
-            # Build citation string for the end
-            if citation_map:
-                citation_lines = []
-                for i, num in sorted(citation_map.items(), key=lambda x: x[1]):
-                    uri = chunks[i].web.uri
-                    citation_lines.append(f"[{num}]({uri})")
-                text = text.rstrip() + "\n\n" + " ".join(citation_lines)
-
-            return text
-        except ValueError as e:
-            self.logger.warning(f"Gemini API ValueError: {str(e)}")
+    def _format_response(self, response, image_mode=False):
+        if not response.candidates:
             return "I apologize, but I cannot provide a response to that query due to safety constraints." if not image_mode else "I apologize, but I cannot analyze this image due to safety constraints."
-        except Exception as e:
-            self.logger.error(f"Gemini API error: {str(e)}")
-            if 'InternalServerError' in str(type(e)):
-                return "I encountered a temporary error. Please try your request again in a moment." if not image_mode else "I encountered a temporary error. Please try analyzing the image again in a moment."
-            return "I apologize, but I encountered an error processing your request." if not image_mode else "I apologize, but I encountered an error analyzing this image."
 
+        # Check for grounding metadata and log the sources.
+        # This is a key step for transparency and debugging.
+        text = response.text
+
+        supports = []
+        chunks = []
+
+        if response.candidates[0].grounding_metadata and response.candidates[0].grounding_metadata.grounding_supports:
+            supports = response.candidates[0].grounding_metadata.grounding_supports
+
+        if response.candidates[0].grounding_metadata and response.candidates[0].grounding_metadata.grounding_chunks:
+            chunks = response.candidates[0].grounding_metadata.grounding_chunks
+
+        sorted_supports = sorted(supports, key=lambda s: s.segment.end_index, reverse=True)
+
+        # Collect all unique citations in order of first appearance
+        citation_map = {}
+        citation_counter = 1
+        for support in sorted_supports:
+            if support.grounding_chunk_indices:
+                for i in support.grounding_chunk_indices:
+                    if i < len(chunks) and i not in citation_map:
+                        citation_map[i] = citation_counter
+                        citation_counter += 1
+        # Build citation string for the end
+        if citation_map:
+            citation_lines = []
+            for i, num in sorted(citation_map.items(), key=lambda x: x[1]):
+                uri = chunks[i].web.uri
+                citation_lines.append(f"[{num}]({uri})")
+            text = text.rstrip() + "\n\n" + " ".join(citation_lines)
+
+        return text
+
+    def _error_reply(self, e, image_mode=False):
+        if isinstance(e, ValueError):
+            self.logger.warning(f"Gemini API ValueError: {str(e)}")
+            return "I apologize, but I cannot provide a response to that query due to safety constraints." if not image_mode else "I apologize, but I cannot analyze this image due to safety constraints."
+        self.logger.error(f"Gemini API error: {str(e)}")
+        if 'InternalServerError' in str(type(e)):
+            return "I encountered a temporary error. Please try your request again in a moment." if not image_mode else "I encountered a temporary error. Please try analyzing the image again in a moment."
+        return "I apologize, but I encountered an error processing your request." if not image_mode else "I apologize, but I encountered an error analyzing this image."
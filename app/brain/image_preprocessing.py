@@ -0,0 +1,63 @@
+import asyncio
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+from app import metrics
+
+DEFAULT_MAX_SIDE = 1280
+DEFAULT_QUALITY = 85
+
+# Pillow releases the GIL while decoding, resizing and encoding, so threads run in parallel
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv('IMAGE_WORKERS', '2')), thread_name_prefix='image')
+
+def select_photo_size(photo_sizes, max_side: int = DEFAULT_MAX_SIDE):
+    """
+    Pick the smallest Telegram PhotoSize whose longest side reaches `max_side`,
+    or the largest one if none does. `photo_sizes` is ordered smallest first, like `message.photo`.
+    """
+    for photo in photo_sizes:
+        if max(photo.width, photo.height) >= max_side:
+            return photo
+    return photo_sizes[-1]
+
+def _open(image_bytes):
+    # Memory maps from the media store are read in place instead of being copied into a BytesIO.
+    # A map has a single file position, so each one must only be preprocessed by one task at a time
+    if hasattr(image_bytes, 'seek'):
+        image_bytes.seek(0)
+        return Image.open(image_bytes)
+    return Image.open(io.BytesIO(image_bytes))
+
+def preprocess_image_sync(image_bytes: bytes, max_side: int = DEFAULT_MAX_SIDE, image_format: str = 'JPEG', quality: int = DEFAULT_QUALITY) -> bytes:
+    """Downsize to fit `max_side`, apply EXIF orientation and re-encode without metadata"""
+    with _open(image_bytes) as image:
+        if (image.format == image_format and max(image.size) <= max_side
+                and not image.info.get('exif') and not image.info.get('icc_profile')):
+            # Already small and clean, re-encoding would only lose quality
+            return bytes(image_bytes)
+        # Let the JPEG decoder skip detail we are going to throw away anyway
+        image.draft('RGB', (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        output = io.BytesIO()
+        # Nothing from image.info is passed on, which drops EXIF, GPS and other metadata
+        image.save(output, format=image_format, quality=quality, optimize=True)
+        return output.getvalue()
+
+async def preprocess_image(image_bytes: bytes, max_side: int = DEFAULT_MAX_SIDE, image_format: str = 'JPEG', quality: int = DEFAULT_QUALITY) -> bytes:
+    start = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(_executor, preprocess_image_sync, image_bytes, max_side, image_format, quality)
+    metrics.observe('vision.preprocess', time.perf_counter() - start)
+    metrics.increment('vision.input_bytes', len(image_bytes))
+    metrics.increment('vision.upload_bytes', len(result))
+    return result
+
+async def preprocess_images(images: list[bytes], max_side: int = DEFAULT_MAX_SIDE, image_format: str = 'JPEG', quality: int = DEFAULT_QUALITY) -> list[bytes]:
+    return list(await asyncio.gather(*(preprocess_image(image, max_side, image_format, quality) for image in images)))
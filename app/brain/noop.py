@@ -1,6 +1,8 @@
 from app.logger import setup_logger
 
 class NoopBrainHandler:
+    MAX_CONCURRENCY = 1
+
     def __init__(self, backend_name: str):
         self.logger = setup_logger()
         self.backend_name = backend_name
@@ -12,9 +14,11 @@ class NoopBrainHandler:
     def set_model(self, model_name):
         pass
 
-    def process(self, prompt, recent_messages=None, system_prompt=""):
+    def process(self, prompt, recent_messages=None, system_prompt="", deadline=None):
         return f"[NOOP] The backend '{self.backend_name}' is not available (missing API key)."
 
-    async def process_image(self, image_bytes: bytearray, caption: str, system_prompt: str = "") -> str:
+    async def process_image(self, image_bytes: bytearray, caption: str, system_prompt: str = "", deadline=None) -> str:
         return f"[NOOP] The backend '{self.backend_name}' is not available (missing API key)."
 
+    async def process_images(self, images: list[bytearray], caption: str, system_prompt: str = "", deadline=None) -> str:
+        return await self.process_image(images[0], caption, system_prompt, deadline=deadline)
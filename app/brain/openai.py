@@ -1,10 +1,13 @@
 import os
-import io
-import openai
+import asyncio
+from openai import OpenAI
 from app.logger import setup_logger
+from app.brain.image_preprocessing import preprocess_images
 
 class OpenAIBrainHandler:
     AVAILABLE_MODELS = ["gpt-4o", "gpt-3.5-turbo"]
+    MAX_CONCURRENCY = 4  # parallel requests allowed by fan-out callers such as /summary
+    IMAGE_MAX_SIDE = 1024  # high detail mode scales the short side down to 768px anyway
 
     def __init__(self, model_name: str = AVAILABLE_MODELS[0]):
         self.logger = setup_logger()
@@ -12,7 +15,7 @@ class OpenAIBrainHandler:
         if not api_key:
             self.logger.error("OPENAI_API_KEY environment variable is not set")
             raise ValueError("OPENAI_API_KEY environment variable is not set")
-        openai.api_key = api_key
+        self.client = OpenAI(api_key=api_key)
         if model_name not in self.AVAILABLE_MODELS:
             self.logger.error(f"Invalid model name {model_name}")
             raise ValueError(f"Invalid model name {model_name}. Must be one of {self.AVAILABLE_MODELS}")
@@ -29,24 +32,33 @@ class OpenAIBrainHandler:
         else:
             raise ValueError(f"Invalid model name: {model_name}")
 
-    def process(self, prompt, recent_messages=None, system_prompt=""):
+    def process(self, prompt, recent_messages=None, system_prompt="", deadline=None):
         context = self._format_context(recent_messages) if recent_messages else ""
         full_prompt = self._format_prompt(prompt, context, system_prompt)
         self._log_prompt(full_prompt)
-        return self._generate_content(full_prompt)
+        return self._generate_content(full_prompt, deadline=deadline)
 
-    async def process_image(self, image_bytes: bytearray, caption: str, system_prompt: str = "") -> str:
-        from PIL import Image
-        image = Image.open(io.BytesIO(image_bytes))
-        prompt = self._format_image_prompt(caption, system_prompt)
+    async def process_image(self, image_bytes: bytearray, caption: str, system_prompt: str = "", deadline=None) -> str:
+        return await self.process_images([image_bytes], caption, system_prompt, deadline=deadline)
+
+    async def process_images(self, images: list[bytearray], caption: str, system_prompt: str = "", deadline=None) -> str:
+        try:
+            images = await preprocess_images(images, self.IMAGE_MAX_SIDE)
+        except Exception as e:
+            # Missing or undecodable image
+            self.logger.error(f"Could not read image: {str(e)}")
+            return "I apologize, but I could not read this image."
+        prompt = self._format_image_prompt(caption, system_prompt, len(images))
         self._log_prompt(prompt)
-        return self._generate_content(prompt, image=image)
+        # The client is blocking, keep it off the event loop so the deadline can cancel the wait
+        return await asyncio.to_thread(self._generate_content, prompt, images=images, deadline=deadline)
 
     def _format_prompt(self, prompt, context, system_prompt):
         return f"{system_prompt}\n{context}\nUser query: {prompt}\nPlease provide a concise and relevant response."
 
-    def _format_image_prompt(self, caption, system_prompt):
-        return f"{system_prompt}Please analyze this image{' and respond to: ' + caption if caption else '.'}\nProvide a clear and concise response."
+    def _format_image_prompt(self, caption, system_prompt, count=1):
+        subject = "this image" if count == 1 else f"these {count} images"
+        return f"{system_prompt}Please analyze {subject}{' and respond to: ' + caption if caption else '.'}\nProvide a clear and concise response."
 
     def _log_prompt(self, prompt):
         self.logger.info(f"Using model: {self.current_model}")
@@ -62,31 +74,31 @@ class OpenAIBrainHandler:
             context.append(f"{msg['username']}: {msg['message_text']}")
         return "\n".join(context)
 
-    def _generate_content(self, prompt, image=None):
+    def _generate_content(self, prompt, images=None, deadline=None):
+        client = self.client
+        if deadline:
+            # Retries would each get the remaining budget again
+            client = client.with_options(timeout=deadline.remaining(), max_retries=0)
         try:
-            if image is None:
+            if not images:
                 # Text-only
-                response = openai.ChatCompletion.create(
+                response = client.chat.completions.create(
                     model=self.current_model,
                     messages=[{"role": "user", "content": prompt}]
                 )
-                return response.choices[0].message["content"]
+                return response.choices[0].message.content
             else:
-                # Image + text (OpenAI Vision, e.g., GPT-4o or GPT-4V)
+                # Image(s) + text (OpenAI Vision, e.g., GPT-4o or GPT-4V)
                 import base64
-                buffered = io.BytesIO()
-                image.save(buffered, format="PNG")
-                img_b64 = base64.b64encode(buffered.getvalue()).decode()
-                response = openai.ChatCompletion.create(
+                content = [{"type": "text", "text": prompt}]
+                for image in images:
+                    img_b64 = base64.b64encode(image).decode()
+                    content.append({"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{img_b64}"}})
+                response = client.chat.completions.create(
                     model=self.current_model,
-                    messages=[
-                        {"role": "user", "content": [
-                            {"type": "text", "text": prompt},
-                            {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{img_b64}"}}
-                        ]}
-                    ]
+                    messages=[{"role": "user", "content": content}]
                 )
-                return response.choices[0].message["content"]
+                return response.choices[0].message.content
         except Exception as e:
             self.logger.error(f"OpenAI API error: {str(e)}")
             return "I apologize, but I encountered an error processing your request."
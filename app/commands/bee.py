@@ -1,6 +1,7 @@
 from telegram import Update
 from telegram.ext import ContextTypes
-from app.commands.history import historyDepthKey, default_history_limit
+from app.commands.history import historyDepthKey, default_history_limit, retrievalDepthKey, default_retrieval_limit
+from app.deadline import Deadline, TIMEOUT_REPLY
 
 class Bee:
     def __init__(self, bot):
@@ -8,8 +9,10 @@ class Bee:
         self.logger = bot.logger
         self.get_brain = bot.get_brain
         self.db = bot.db
+        self.index = bot.index
 
     async def __call__(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        deadline = Deadline.of(context)
         chat_id = update.effective_chat.id
         username = update.effective_user.username or update.effective_user.first_name
         query = " ".join(context.args) if context.args else ""
@@ -22,6 +25,10 @@ class Bee:
         messages_limit = self.db.get_setting(chat_id, historyDepthKey, default_history_limit)
 
         recent_messages = self.db.get_recent_messages(chat_id, messages_limit)
+        # Older messages relevant to the query go after the recent tail, since brains read the list newest first
+        retrieval_limit = int(self.db.get_setting(chat_id, retrievalDepthKey, default_retrieval_limit))
+        related_ids = self.index.search(chat_id, query, k=retrieval_limit, exclude_ids=[msg['id'] for msg in recent_messages])
+        recent_messages += self.db.get_messages_by_ids(chat_id, related_ids)
         if query:
             command_text = f"{username}: {query}"
             self.db.store_message(
@@ -36,7 +43,7 @@ class Bee:
         context_setting = self.db.get_setting(chat_id, "context", "")
         contexts = context_setting.split("\n") if context_setting else []
         system_prompt = "\n".join([f"System: {ctx}" for ctx in contexts]) + "\n" if contexts else ""
-        response = brain.process(command_text, recent_messages, system_prompt)
+        response = await deadline.call("brain", TIMEOUT_REPLY, brain.process, command_text, recent_messages, system_prompt, deadline=deadline)
         self.logger.info(f"Generated response for {username}: {response}...")
         await self.send_response(response, update)
         await update.message.set_reaction([])
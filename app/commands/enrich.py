@@ -0,0 +1,24 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from app.services.enrichment import enrichmentKey
+
+class Enrich:
+    def __init__(self, bot):
+        self.bot = bot
+        self.logger = bot.logger
+        self.db = bot.db
+
+    async def __call__(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        chat_id = update.message.chat_id
+        enrichment = self.db.get_setting(chat_id, enrichmentKey, "off")
+        text = " ".join(context.args)
+        if text == "on" or text == "off":
+            self.db.set_setting(chat_id, enrichmentKey, text)
+            self.logger.info(f"Media enrichment turned {text} for chat {chat_id}")
+            await update.message.set_reaction("👍")
+        else:
+            msg = f"Media enrichment is currently {enrichment}."
+            msg += "\nWhen on, voice notes and photos are transcribed and described in the background as they arrive."
+            msg += "\n\nUsage: /enrich [on|off]"
+            await update.message.reply_text(msg)
@@ -16,6 +16,10 @@ class Help:
 • `/context <instruction>` - Set bot behavior (e.g., "be more concise")
 • `/context clear` - Clear all contexts
 • `/context show` - Show active contexts
+• `/history [depth] [retrieved]` - Show or set how many recent messages, and related older ones, `/b` reads
+• `/summary [hours]` - Summarize the last hours of the chat (default 24)
+• `/stats` - Show cache hit rates, timeouts and latencies
+• `/enrich on|off` - Transcribe and describe voice notes and photos in the background
 • `/help` - Show this help message
 
 **Photo Analysis:**
@@ -28,6 +32,8 @@ class Help:
 • Reply to a voice message with `?`, `b`, or `bot` to get transcript
 • Reply to a voice message with `b <question>` to ask about its content
 
+• `/stt [provider|auto]` - Show or pin the speech-to-text provider
+
 **Text-to-Speech:**
 • Reply to any text message with `tts` to convert it to speech (Greek voice)
 
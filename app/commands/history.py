@@ -3,6 +3,8 @@ from telegram.ext import ContextTypes
 
 historyDepthKey = 'history_depth'
 default_history_limit = 10
+retrievalDepthKey = 'retrieval_depth'
+default_retrieval_limit = 5
 
 class History:
     def __init__(self, bot):
@@ -14,17 +16,26 @@ class History:
         chat_id = update.effective_chat.id
 
         try:
-            if len(context.args) > 1 or (context.args and not context.args[0].isdigit()):
-                await update.message.reply_text("Usage: /history [depth]\nExample: /history 20 to set history depth to 20 messages.")
+            if len(context.args) > 2 or not all(arg.isdigit() for arg in context.args):
+                await update.message.reply_text("Usage: /history [depth] [retrieved]\n"
+                                                "Example: /history 20 to set history depth to 20 messages.\n"
+                                                "/history 20 5 also adds up to 5 older messages related to a /b query.")
                 return
 
             if not context.args:
                 history_depth = self.db.get_setting(chat_id, historyDepthKey, default_history_limit)
-                await update.message.reply_text(f"Current history depth: {history_depth}\n\n")
+                retrieval_depth = self.db.get_setting(chat_id, retrievalDepthKey, default_retrieval_limit)
+                await update.message.reply_text(f"Current history depth: {history_depth}\n"
+                                                f"Related older messages retrieved: {retrieval_depth}\n\n")
                 return
 
             history_depth = context.args[0]
             self.db.set_setting(chat_id, historyDepthKey, history_depth)
+            if len(context.args) == 2:
+                retrieval_depth = context.args[1]
+                self.db.set_setting(chat_id, retrievalDepthKey, retrieval_depth)
+                await update.message.reply_text(f"✅ Changed history depth to {history_depth} and retrieved messages to {retrieval_depth}")
+                return
             await update.message.reply_text(f"✅ Changed history depth to {history_depth}")
 
         except Exception as e:
@@ -0,0 +1,37 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from app import metrics
+
+class Stats:
+    def __init__(self, bot):
+        self.bot = bot
+        self.logger = bot.logger
+
+    async def __call__(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        snapshot = metrics.snapshot()
+        counters = snapshot['counters']
+        lines = ["📊 Bot stats since start"]
+
+        # Caches count `<name>.hit` and `<name>.miss`, report those as hit rates
+        caches = sorted({name.rsplit('.', 1)[0] for name in counters if name.endswith(('.hit', '.miss'))})
+        if caches:
+            lines.append("\nCaches:")
+            for cache in caches:
+                hits, misses = counters.get(f"{cache}.hit", 0), counters.get(f"{cache}.miss", 0)
+                lines.append(f"• {cache}: {hits}/{hits + misses} hits ({hits / (hits + misses):.0%})")
+
+        others = sorted(name for name in counters if not name.endswith(('.hit', '.miss')))
+        if others:
+            lines.append("\nCounters:")
+            lines.extend(f"• {name}: {counters[name]}" for name in others)
+
+        if snapshot['timings']:
+            lines.append("\nTimings:")
+            for name, timing in sorted(snapshot['timings'].items()):
+                lines.append(f"• {name}: {timing['count']} calls, avg {timing['avg']:.2f}s, max {timing['max']:.2f}s")
+
+        if len(lines) == 1:
+            lines.append("Nothing recorded yet.")
+        await update.message.reply_text("\n".join(lines))
+        self.logger.info(f"Stats command used in chat {update.effective_chat.id}")
@@ -0,0 +1,51 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from app.handlers.stt.stt_handler import sttProviderKey
+
+class STT:
+    def __init__(self, bot):
+        self.bot = bot
+        self.logger = bot.logger
+        self.db = bot.db
+        self.stt = bot.voice.stt
+
+    async def __call__(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        chat_id = update.effective_chat.id
+
+        try:
+            if not context.args:
+                pinned = self.db.get_setting(chat_id, sttProviderKey, None)
+                msg = ["🎙 Speech-to-Text Settings", ""]
+                msg.append(f"Provider: {pinned} (pinned)" if pinned else "Provider: automatic (fastest healthy)")
+                msg.append("Available providers:")
+                for idx, name in enumerate(self.stt.candidates(chat_id), 1):
+                    stats = self.stt.stats[name]
+                    health = "healthy" if self.stt.is_healthy(name) else "unhealthy"
+                    msg.append(f"  {idx}. {name} - {health}, avg {stats.latency:.2f}s, "
+                               f"{stats.error_rate:.0%} errors over {len(stats.samples)} requests")
+                msg.append("")
+                msg.append("Commands:")
+                msg.append("/stt - Show this help message")
+                msg.append("/stt <provider> - Always use a provider in this chat")
+                msg.append("/stt auto - Pick the fastest healthy provider")
+                await update.message.reply_text("\n".join(msg))
+                return
+
+            provider = context.args[0].lower()
+            if provider == "auto":
+                self.db.delete_setting(chat_id, sttProviderKey)
+                await update.message.reply_text("✅ Speech-to-text provider is picked automatically")
+            elif provider in self.stt.get_available_providers():
+                self.db.set_setting(chat_id, sttProviderKey, provider)
+                await update.message.reply_text(f"✅ Pinned speech-to-text provider: {provider}")
+            else:
+                available = self.stt.get_available_providers()
+                await update.message.reply_text(
+                    f"❌ Invalid provider. Available options: {', '.join(available)} or auto"
+                )
+
+        except Exception as e:
+            error_msg = f"Error configuring STT: {str(e)}"
+            self.logger.error(error_msg)
+            await update.message.reply_text(error_msg)
@@ -0,0 +1,126 @@
+import asyncio
+import hashlib
+import os
+from datetime import datetime, timezone, timedelta
+from telegram import Update
+from telegram.ext import ContextTypes
+from app.deadline import Deadline, TIMEOUT_REPLY
+from app.brain import ERROR_PREFIXES
+
+default_summary_hours = 24
+max_summary_hours = 24 * 7
+chunk_max_chars = 6000
+summary_budget = float(os.getenv('SUMMARY_DEADLINE_SECONDS', '180'))
+
+CHUNK_PROMPT = ("Summarize the following part of a group chat conversation. "
+                "Keep the key topics, decisions, questions and who said what. Use short bullet points.\n\n{transcript}")
+REDUCE_PROMPT = ("Here are summaries of consecutive parts of a group chat conversation, oldest first. "
+                 "Merge them into a single concise summary of the whole conversation.\n\n{summaries}")
+
+class Summary:
+    # One limiter per backend, shared by every chat, so fan-out stays within the backend's rate limits
+    limiters: dict[str, asyncio.Semaphore] = {}
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.logger = bot.logger
+        self.get_brain = bot.get_brain
+        self.db = bot.db
+
+    async def __call__(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        chat_id = update.effective_chat.id
+        username = update.effective_user.username or update.effective_user.first_name
+
+        if len(context.args) > 1 or (context.args and not context.args[0].isdigit()):
+            await update.message.reply_text("Usage: /summary [hours]\nExample: /summary 6 to summarize the last 6 hours.")
+            return
+        hours = min(int(context.args[0]) if context.args else default_summary_hours, max_summary_hours)
+        self.logger.info(f"Received /summary command from {username} (chat_id: {chat_id}) for the last {hours} hours")
+
+        since = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(hours=hours)
+        messages = [msg for msg in self.db.get_messages_since(chat_id, since) if msg['message_text']]
+        if not messages:
+            await update.message.reply_text(f"No messages in the last {hours} hours.")
+            return
+
+        await update.message.set_reaction("👀")
+        deadline = Deadline(summary_budget)
+        brain = self.get_brain(chat_id)
+        limiter = self.limiters.setdefault(type(brain).__name__, asyncio.Semaphore(getattr(brain, 'MAX_CONCURRENCY', 1)))
+
+        chunks = self.chunk_messages(messages)
+        self.logger.info(f"Summarizing {len(messages)} messages in {len(chunks)} chunks for chat {chat_id}")
+        results = await asyncio.gather(*(self.summarize_chunk(brain, chunk, limiter, deadline) for chunk in chunks))
+        # Timed out chunks and error replies are left out of the merged summary
+        partials = [partial for partial in results if partial and not partial.startswith(ERROR_PREFIXES)]
+
+        if not partials:
+            errors = [result for result in results if result]
+            summary = errors[0] if errors else TIMEOUT_REPLY
+        elif len(partials) == 1:
+            summary = partials[0]
+        else:
+            summary = await self.process_limited(brain, REDUCE_PROMPT.format(summaries="\n\n".join(partials)),
+                                                 limiter, deadline, TIMEOUT_REPLY)
+
+        try:
+            await update.message.reply_markdown(summary)
+        except Exception as e:
+            self.logger.error(f"Error sending summary: {e}")
+            await update.message.reply_text(summary)
+        await update.message.set_reaction([])
+
+    @staticmethod
+    def chunk_messages(messages: list[dict]) -> list[list[dict]]:
+        """
+        Split messages into chunks aligned to clock hours, then by size.
+        Aligned boundaries keep chunks identical across overlapping ranges, so their cached summaries are reused.
+        """
+        chunks = []
+        current, current_hour, current_size = [], None, 0
+        for msg in messages:
+            hour = str(msg['timestamp'])[:13]
+            size = len(msg['message_text'])
+            if current and (hour != current_hour or current_size + size > chunk_max_chars):
+                chunks.append(current)
+                current, current_size = [], 0
+            current.append(msg)
+            current_hour = hour
+            current_size += size
+        if current:
+            chunks.append(current)
+        return chunks
+
+    async def summarize_chunk(self, brain, chunk: list[dict], limiter: asyncio.Semaphore, deadline: Deadline) -> str:
+        transcript = "\n".join(f"{msg['username']}: {msg['message_text']}" for msg in chunk)
+        model = getattr(brain, 'current_model', getattr(brain, 'model_name', ''))
+        cache_key = hashlib.sha256(f"{type(brain).__name__}/{model}\n{CHUNK_PROMPT}\n{transcript}".encode()).hexdigest()
+
+        cached = self.db.get_summary(cache_key)
+        if cached:
+            self.logger.debug(f"Summary cache hit for chunk {cache_key[:12]}")
+            return cached
+
+        partial = await self.process_limited(brain, CHUNK_PROMPT.format(transcript=transcript), limiter, deadline, None)
+        if partial and not partial.startswith(ERROR_PREFIXES):
+            self.db.store_summary(cache_key, partial)
+        return partial
+
+    @staticmethod
+    async def process_limited(brain, prompt: str, limiter: asyncio.Semaphore, deadline: Deadline, fallback):
+        """
+        Run `brain.process` in a worker thread within the deadline. The limiter slot is held until
+        the thread returns, also when the deadline gives up on it first, since the backend call
+        keeps running.
+        """
+        await limiter.acquire()
+        if deadline.expired:
+            limiter.release()
+            return await deadline.call("summary", fallback, brain.process, prompt, deadline=deadline)
+
+        async def process():
+            try:
+                return await asyncio.to_thread(brain.process, prompt, deadline=deadline)
+            finally:
+                limiter.release()
+        return await deadline.run("summary", asyncio.shield(asyncio.create_task(process())), fallback)
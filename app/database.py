@@ -1,10 +1,11 @@
 import sqlite3
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Callable, Tuple
 
 class DatabaseHandler:
     def __init__(self, db_path: str = "messages.db"):
         self.db_path = db_path
+        self.store_listeners: List[Callable[[int, int, str], None]] = []
         self._create_tables()
 
     def _create_tables(self):
@@ -28,6 +29,68 @@ class DatabaseHandler:
             columns = [row[1] for row in cursor.fetchall()]
             if 'message_id' not in columns:
                 cursor.execute('ALTER TABLE messages ADD COLUMN message_id INTEGER')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_messages_chat_message ON messages (chat_id, message_id)')
+            # Media files are stored once by content hash, this maps messages to them.
+            # hash is NULL while the bytes have not been downloaded from Telegram yet
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS media (
+                    chat_id INTEGER NOT NULL,
+                    message_id INTEGER NOT NULL,
+                    hash TEXT,
+                    category TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mime TEXT,
+                    file_id TEXT,
+                    file_unique_id TEXT,
+                    created_at DATETIME NOT NULL,
+                    PRIMARY KEY (chat_id, message_id)
+                )
+            ''')
+            # Migration: add Telegram file ids and storage bookkeeping if not exists
+            cursor.execute("PRAGMA table_info(media)")
+            columns = [row[1] for row in cursor.fetchall()]
+            # original_hash is the hash a recompressed object was first stored under
+            for column, column_type in (('file_id', 'TEXT'), ('file_unique_id', 'TEXT'),
+                                        ('last_access', 'DATETIME'), ('recompressed', 'INTEGER DEFAULT 0'),
+                                        ('original_hash', 'TEXT')):
+                if column not in columns:
+                    cursor.execute(f'ALTER TABLE media ADD COLUMN {column} {column_type}')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_media_hash ON media (hash)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_media_file_unique_id ON media (file_unique_id)')
+            # Cached partial summaries, keyed by a hash of the model and the summarized messages
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS summaries (
+                    cache_key TEXT PRIMARY KEY,
+                    summary TEXT NOT NULL,
+                    created_at DATETIME NOT NULL
+                )
+            ''')
+            # Voice transcripts, keyed by the audio content hash and the transcription model version
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS transcripts (
+                    audio_hash TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    transcript TEXT NOT NULL,
+                    created_at DATETIME NOT NULL,
+                    PRIMARY KEY (audio_hash, model)
+                )
+            ''')
+            # Cached photo descriptions, keyed by a hash of the model, the chat context and the image
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS descriptions (
+                    cache_key TEXT PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    created_at DATETIME NOT NULL
+                )
+            ''')
+            # Telegram file ids of media the bot has sent, so the same content is not uploaded again
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS telegram_files (
+                    cache_key TEXT PRIMARY KEY,
+                    file_id TEXT NOT NULL,
+                    created_at DATETIME NOT NULL
+                )
+            ''')
             # Settings table with chat_id support
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS settings (
@@ -39,8 +102,12 @@ class DatabaseHandler:
             ''')
             conn.commit()
 
-    def store_message(self, chat_id: int, user_id: int, username: str, message_text: str, timestamp: datetime, message_id: int = None):
-        """Store a new message in the database, with optional message_id"""
+    def add_store_listener(self, listener: Callable[[int, int, str], None]):
+        """Register a callback invoked with (chat_id, row_id, message_text) after each stored message"""
+        self.store_listeners.append(listener)
+
+    def store_message(self, chat_id: int, user_id: int, username: str, message_text: str, timestamp: datetime, message_id: int = None) -> int:
+        """Store a new message in the database, with optional message_id. Returns the row id"""
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute('''
@@ -48,6 +115,10 @@ class DatabaseHandler:
                 VALUES (?, ?, ?, ?, ?, ?)
             ''', (chat_id, user_id, username, message_text, timestamp, message_id))
             conn.commit()
+            row_id = cursor.lastrowid
+        for listener in self.store_listeners:
+            listener(chat_id, row_id, message_text)
+        return row_id
 
     def get_recent_messages(self, chat_id: int, limit: int = 10) -> List[Dict]:
         """Retrieve recent messages for a specific chat"""
@@ -61,18 +132,60 @@ class DatabaseHandler:
                 LIMIT ?
             ''', (chat_id, limit))
 
-            messages = []
-            for row in cursor.fetchall():
-                messages.append({
-                    'chat_id': row['chat_id'],
-                    'user_id': row['user_id'],
-                    'username': row['username'],
-                    'message_id': row['message_id'],
-                    'message_text': row['message_text'],
-                    'timestamp': row['timestamp']
-                })
+            return [self._row_to_message(row) for row in cursor.fetchall()]
 
-            return messages
+    def get_messages_by_ids(self, chat_id: int, row_ids: List[int]) -> List[Dict]:
+        """Retrieve specific messages of a chat by row id, newest first"""
+        if not row_ids:
+            return []
+        placeholders = ", ".join("?" for _ in row_ids)
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT * FROM messages
+                WHERE chat_id = ? AND id IN ({placeholders})
+                ORDER BY timestamp DESC
+            ''', (chat_id, *row_ids))
+            return [self._row_to_message(row) for row in cursor.fetchall()]
+
+    def get_message_texts(self, chat_id: int, limit: int, before_id: int = None) -> List[Tuple[int, str]]:
+        """(row id, text) of a chat's latest `limit` messages, optionally only those before a row id, oldest first"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, message_text FROM (
+                    SELECT id, message_text FROM messages
+                    WHERE chat_id = ? AND id < ?
+                    ORDER BY id DESC
+                    LIMIT ?
+                ) ORDER BY id ASC
+            ''', (chat_id, before_id if before_id is not None else 2 ** 63 - 1, limit))
+            return cursor.fetchall()
+
+    @staticmethod
+    def _row_to_message(row: sqlite3.Row) -> Dict:
+        return {
+            'id': row['id'],
+            'chat_id': row['chat_id'],
+            'user_id': row['user_id'],
+            'username': row['username'],
+            'message_id': row['message_id'],
+            'message_text': row['message_text'],
+            'timestamp': row['timestamp']
+        }
+
+    def get_messages_since(self, chat_id: int, since: datetime) -> List[Dict]:
+        """Retrieve all messages of a chat newer than `since`, oldest first"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT * FROM messages
+                WHERE chat_id = ? AND timestamp >= ?
+                ORDER BY timestamp ASC, id ASC
+            ''', (chat_id, since))
+            return [self._row_to_message(row) for row in cursor.fetchall()]
 
     def get_message_text(self, chat_id: int, message_id: int) -> str:
         """Retrieve the text of a specific message by chat_id and message_id"""
@@ -85,6 +198,202 @@ class DatabaseHandler:
             result = cursor.fetchone()
             return result[0] if result else ""
 
+    def store_media(self, chat_id: int, message_id: int, digest: str, category: str, size: int, mime: str = None,
+                    file_id: str = None, file_unique_id: str = None, original_hash: str = None):
+        """Record a message's media: its content hash (None if not downloaded yet) and Telegram file ids"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT OR REPLACE INTO media (chat_id, message_id, hash, category, size, mime, file_id, file_unique_id, original_hash, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (chat_id, message_id, digest, category, size, mime, file_id, file_unique_id, original_hash, datetime.now()))
+            conn.commit()
+
+    def get_media_by_unique_id(self, file_unique_id: str) -> Dict:
+        """Get a downloaded media record for a Telegram file_unique_id, from any chat"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM media WHERE file_unique_id = ? AND hash IS NOT NULL LIMIT 1', (file_unique_id,))
+            result = cursor.fetchone()
+            return dict(result) if result else None
+
+    def get_media(self, chat_id: int, message_id: int) -> Dict:
+        """Get the media record of a message, or None if it has no stored media"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM media WHERE chat_id = ? AND message_id = ?', (chat_id, message_id))
+            result = cursor.fetchone()
+            return dict(result) if result else None
+
+    def touch_media(self, chat_id: int, message_id: int):
+        """Mark a message's media as just used, for LRU eviction"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('UPDATE media SET last_access = ? WHERE chat_id = ? AND message_id = ?',
+                          (datetime.now(), chat_id, message_id))
+            conn.commit()
+
+    def get_media_usage(self) -> Dict:
+        """Stored bytes in total (each object counted once), per category and per chat"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT category, SUM(size) FROM (
+                    SELECT hash, category, MAX(size) AS size FROM media WHERE hash IS NOT NULL GROUP BY hash
+                ) GROUP BY category
+            ''')
+            categories = {category: size for category, size in cursor.fetchall()}
+            cursor.execute('SELECT chat_id, SUM(size) FROM media WHERE hash IS NOT NULL GROUP BY chat_id')
+            chats = {chat_id: size for chat_id, size in cursor.fetchall()}
+            return {'total': sum(categories.values()), 'categories': categories, 'chats': chats}
+
+    def get_lru_media(self, limit: int, category: str = None, chat_id: int = None) -> List[Dict]:
+        """Stored media records, least recently used first, optionally restricted to a category or chat"""
+        query = 'SELECT * FROM media WHERE hash IS NOT NULL'
+        args = []
+        if category is not None:
+            query += ' AND category = ?'
+            args.append(category)
+        if chat_id is not None:
+            query += ' AND chat_id = ?'
+            args.append(chat_id)
+        query += ' ORDER BY COALESCE(last_access, created_at) ASC LIMIT ?'
+        args.append(limit)
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(query, args)
+            return [dict(row) for row in cursor.fetchall()]
+
+    def unlink_media(self, chat_id: int, message_id: int) -> bool:
+        """Drop a message's reference to its stored bytes. Returns True if no other message references them"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT hash FROM media WHERE chat_id = ? AND message_id = ?', (chat_id, message_id))
+            result = cursor.fetchone()
+            if not result or result[0] is None:
+                return False
+            cursor.execute('UPDATE media SET hash = NULL WHERE chat_id = ? AND message_id = ?', (chat_id, message_id))
+            cursor.execute('SELECT COUNT(*) FROM media WHERE hash = ?', (result[0],))
+            orphaned = cursor.fetchone()[0] == 0
+            conn.commit()
+            return orphaned
+
+    def get_media_to_recompress(self, older_than: datetime, limit: int) -> List[Dict]:
+        """Stored media objects created before `older_than` that have not been recompressed yet"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT hash, category, MAX(size) AS size, mime FROM media
+                WHERE hash IS NOT NULL AND recompressed = 0 AND created_at < ?
+                GROUP BY hash LIMIT ?
+            ''', (older_than, limit))
+            return [dict(row) for row in cursor.fetchall()]
+
+    def replace_media_hash(self, old_digest: str, new_digest: str, size: int, mime: str):
+        """
+        Point every message stored under `old_digest` to a recompressed object. Transcripts of the
+        old audio are copied to the new hash, and the old hash is kept as the records' original_hash
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE media SET original_hash = COALESCE(original_hash, hash), hash = ?, size = ?, mime = ?, recompressed = 1
+                WHERE hash = ?
+            ''', (new_digest, size, mime, old_digest))
+            if new_digest != old_digest:
+                cursor.execute('''
+                    INSERT OR IGNORE INTO transcripts (audio_hash, model, transcript, created_at)
+                    SELECT ?, model, transcript, created_at FROM transcripts WHERE audio_hash = ?
+                ''', (new_digest, old_digest))
+            conn.commit()
+
+    def get_summary(self, cache_key: str) -> str:
+        """Get a cached summary by its cache key"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT summary FROM summaries WHERE cache_key = ?', (cache_key,))
+            result = cursor.fetchone()
+            return result[0] if result else None
+
+    def store_summary(self, cache_key: str, summary: str):
+        """Cache a summary under its cache key"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('INSERT OR REPLACE INTO summaries (cache_key, summary, created_at) VALUES (?, ?, ?)',
+                          (cache_key, summary, datetime.now()))
+            conn.commit()
+
+    def get_transcript(self, audio_hash: str, models: List[str]) -> str:
+        """Get a cached transcript of an audio file made by any of the given transcription models"""
+        if not models:
+            return None
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            placeholders = ','.join('?' * len(models))
+            cursor.execute(f'SELECT transcript FROM transcripts WHERE audio_hash = ? AND model IN ({placeholders}) '
+                           f'ORDER BY created_at DESC LIMIT 1', (audio_hash, *models))
+            result = cursor.fetchone()
+            return result[0] if result else None
+
+    def store_transcript(self, audio_hash: str, model: str, transcript: str):
+        """Cache the transcript of an audio file for a transcription model"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('INSERT OR REPLACE INTO transcripts (audio_hash, model, transcript, created_at) VALUES (?, ?, ?, ?)',
+                          (audio_hash, model, transcript, datetime.now()))
+            conn.commit()
+
+    def get_description(self, cache_key: str) -> str:
+        """Get a cached photo description by its cache key"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT description FROM descriptions WHERE cache_key = ?', (cache_key,))
+            result = cursor.fetchone()
+            return result[0] if result else None
+
+    def store_description(self, cache_key: str, description: str):
+        """Cache a photo description under its cache key"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('INSERT OR REPLACE INTO descriptions (cache_key, description, created_at) VALUES (?, ?, ?)',
+                          (cache_key, description, datetime.now()))
+            conn.commit()
+
+    def get_telegram_file_id(self, cache_key: str) -> str:
+        """Get the Telegram file id of previously sent content"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT file_id FROM telegram_files WHERE cache_key = ?', (cache_key,))
+            result = cursor.fetchone()
+            return result[0] if result else None
+
+    def store_telegram_file_id(self, cache_key: str, file_id: str):
+        """Remember the Telegram file id of sent content"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('INSERT OR REPLACE INTO telegram_files (cache_key, file_id, created_at) VALUES (?, ?, ?)',
+                          (cache_key, file_id, datetime.now()))
+            conn.commit()
+
+    def get_telegram_files(self, prefix: str) -> List[Tuple[str, str]]:
+        """Get (cache_key, file_id) of all sent content whose cache key starts with `prefix`, oldest first"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT cache_key, file_id FROM telegram_files WHERE substr(cache_key, 1, ?) = ? ORDER BY created_at',
+                          (len(prefix), prefix))
+            return cursor.fetchall()
+
+    def delete_telegram_file_id(self, cache_key: str):
+        """Forget a Telegram file id that is no longer accepted"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM telegram_files WHERE cache_key = ?', (cache_key,))
+            conn.commit()
+
     def get_setting(self, chat_id: int, key: str, default: str = None) -> str:
         """Get a setting value by chat_id and key"""
         with sqlite3.connect(self.db_path) as conn:
@@ -101,3 +410,10 @@ class DatabaseHandler:
                           (chat_id, key, value))
             conn.commit()
 
+
+    def delete_setting(self, chat_id: int, key: str):
+        """Remove a setting for a specific chat, so its default applies again"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM settings WHERE chat_id = ? AND key = ?', (chat_id, key))
+            conn.commit()
@@ -0,0 +1,58 @@
+import asyncio
+import os
+import time
+
+from app import metrics
+from app.logger import setup_logger
+
+DEFAULT_BUDGET = float(os.getenv('UPDATE_DEADLINE_SECONDS', '45'))
+TIMEOUT_REPLY = "Sorry, this is taking too long. Please try again in a moment."
+
+class Deadline:
+    """Time budget for handling a single Telegram update.
+
+    Create one when the update arrives and pass it down to the brain, voice and
+    TTS layers. Calls that outlive the budget are cancelled and the caller gets
+    the fallback value instead.
+    """
+
+    def __init__(self, budget: float = None):
+        self.logger = setup_logger()
+        self.budget = DEFAULT_BUDGET if budget is None else budget
+        self.expires_at = time.monotonic() + self.budget
+
+    @classmethod
+    def of(cls, context) -> "Deadline":
+        """The deadline the dispatcher started when the update arrived, or a new one"""
+        return getattr(context, 'deadline', None) or cls()
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    async def run(self, stage: str, awaitable, fallback=None):
+        """Await `awaitable` within the remaining budget, returning `fallback` on timeout"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            return self._timed_out(stage, fallback)
+        try:
+            return await asyncio.wait_for(awaitable, timeout=remaining)
+        except asyncio.TimeoutError:
+            return self._timed_out(stage, fallback)
+
+    async def call(self, stage: str, fallback, func, *args, **kwargs):
+        """Run a blocking `func` in a worker thread within the remaining budget"""
+        if self.expired:
+            return self._timed_out(stage, fallback)
+        return await self.run(stage, asyncio.to_thread(func, *args, **kwargs), fallback)
+
+    def _timed_out(self, stage: str, fallback):
+        metrics.increment(f"timeout.{stage}")
+        self.logger.warning(f"Deadline of {self.budget}s exceeded in stage '{stage}' "
+                            f"({metrics.get(f'timeout.{stage}')} timeouts so far)")
+        return fallback
@@ -0,0 +1,120 @@
+import asyncio
+import os
+import time
+from collections import deque
+
+from telegram import Update, ReactionTypeEmoji
+from telegram.ext import ContextTypes
+
+from app import metrics
+from app.deadline import Deadline
+
+BUSY_REACTION = "🥱"
+
+class ChatDispatcher:
+    """
+    Runs handlers through per-chat FIFO queues served by a bounded pool of workers.
+
+    A chat is handed to at most one worker at a time, so its updates are handled in the order
+    they arrived. After each job the chat goes to the back of the ready queue, so a flooding
+    group takes turns with everyone else instead of starving them. When a chat already has
+    DISPATCH_CHAT_QUEUE jobs waiting, or DISPATCH_MAX_PENDING are waiting overall, the update
+    is shed: it gets a 🥱 reaction instead of an answer, unless it was submitted `quiet`, for work
+    nobody explicitly asked the bot for.
+
+    The update's Deadline starts when it is submitted, so time spent queued counts against its
+    budget; handlers get it as `context.deadline`. Jobs whose budget ran out while queued are
+    shed too.
+    """
+
+    def __init__(self, bot):
+        self.logger = bot.logger
+        self.workers = int(os.getenv('DISPATCH_WORKERS', '8'))
+        self.chat_queue_size = int(os.getenv('DISPATCH_CHAT_QUEUE', '10'))
+        self.max_pending = int(os.getenv('DISPATCH_MAX_PENDING', '100'))
+        # Chats with queued or running jobs; a chat is in `ready` only while none of its jobs runs
+        self.queues: dict[int, deque] = {}
+        self.ready = asyncio.Queue()
+        self.pending = 0
+        self._tasks = []
+        self._reactions = set()
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self.logger.info(f"Chat dispatcher started with {self.workers} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def wrap(self, callback, on_shed=None):
+        """Handler callback that queues `callback` for the update's chat; `on_shed` still runs for shed updates"""
+        async def dispatch(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            await self.submit(callback, update, context, on_shed)
+        return dispatch
+
+    async def submit(self, callback, update: Update, context: ContextTypes.DEFAULT_TYPE, on_shed=None, quiet: bool = False):
+        chat_id = update.effective_chat.id if update.effective_chat else 0
+        jobs = self.queues.get(chat_id)
+        if self.pending >= self.max_pending or (jobs and len(jobs) >= self.chat_queue_size):
+            self.logger.warning(f"Busy, shedding update {update.update_id} for chat {chat_id} "
+                                f"({len(jobs) if jobs else 0} queued in chat, {self.pending} overall)")
+            await self.shed(update, context, on_shed, quiet)
+            return
+        if jobs is None:
+            jobs = self.queues[chat_id] = deque()
+            self.ready.put_nowait(chat_id)
+        jobs.append((callback, update, context, on_shed, quiet, Deadline(), time.monotonic()))
+        self.pending += 1
+        metrics.increment('dispatch.queued')
+
+    async def _worker(self, number: int):
+        while True:
+            chat_id = await self.ready.get()
+            jobs = self.queues[chat_id]
+            callback, update, context, on_shed, quiet, deadline, queued_at = jobs.popleft()
+            self.pending -= 1
+            metrics.observe('dispatch.wait', time.monotonic() - queued_at)
+            try:
+                if deadline.expired:
+                    metrics.increment('dispatch.expired')
+                    self.logger.warning(f"Update {update.update_id} for chat {chat_id} ran out of time while queued")
+                    await self.shed(update, context, on_shed, quiet)
+                    continue
+                context.deadline = deadline
+                await callback(update, context)
+            except Exception as e:
+                metrics.increment('dispatch.failed')
+                self.logger.error(f"Dispatcher worker {number} failed on update {update.update_id} in chat {chat_id}: {e}")
+            finally:
+                # Back of the line if the chat has more work, so chats take turns
+                if jobs:
+                    self.ready.put_nowait(chat_id)
+                else:
+                    del self.queues[chat_id]
+
+    async def shed(self, update: Update, context: ContextTypes.DEFAULT_TYPE, on_shed=None, quiet: bool = False):
+        metrics.increment('dispatch.shed')
+        if on_shed:
+            await on_shed(update, context)
+        if quiet:
+            return
+        # Not awaited: under a flood a Telegram round-trip per dropped update would stall the update loop
+        task = asyncio.create_task(self.busy(update, context))
+        self._reactions.add(task)
+        task.add_done_callback(self._reactions.discard)
+
+    async def busy(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        try:
+            if update.effective_message:
+                await update.effective_message.set_reaction([ReactionTypeEmoji(BUSY_REACTION)])
+            elif update.message_reaction:
+                await context.bot.set_message_reaction(
+                    chat_id=update.effective_chat.id,
+                    message_id=update.message_reaction.message_id,
+                    reaction=[ReactionTypeEmoji(BUSY_REACTION)]
+                )
+        except Exception as e:
+            self.logger.error(f"Error setting busy reaction: {e}")
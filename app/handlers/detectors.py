@@ -0,0 +1,203 @@
+import os
+import random
+from abc import ABC, abstractmethod
+from collections import deque
+
+from telegram import Update
+from telegram.error import BadRequest
+from telegram.ext import ContextTypes
+
+from app import metrics
+from app.handlers.utils import LAUGHTER
+from app.services.giphy import GiphyService
+
+class SlidingWindow:
+    """Number of hits among the last `size` messages, updated in O(1) per message"""
+
+    __slots__ = ('hits', 'count')
+
+    def __init__(self, size: int):
+        self.hits = deque(maxlen=size)
+        self.count = 0
+
+    def push(self, hit: bool) -> int:
+        if len(self.hits) == self.hits.maxlen:
+            self.count -= self.hits[0]
+        self.hits.append(hit)
+        self.count += hit
+        return self.count
+
+class Detector(ABC):
+    """
+    Reacts when enough of a chat's recent messages match a pattern.
+    Fires when the current message matches, at least `threshold` of the last `window` messages
+    matched, and `cooldown` messages have passed since it last fired. All state is kept in
+    memory, per chat. Subclasses set the pattern and implement `fire`.
+    """
+
+    name = ""
+    pattern = None  # compiled regex
+    window = 5
+    threshold = 3
+    cooldown = 10  # messages
+
+    def __init__(self):
+        self.windows: dict[int, SlidingWindow] = {}
+        self.last_fired: dict[int, int] = {}
+        # Chats with a fire queued but not yet done, so it is not queued twice
+        self.firing: set[int] = set()
+
+    def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def matches(self, text: str) -> bool:
+        return bool(self.pattern.search(text))
+
+    def load_last_fired(self, chat_id: int) -> int:
+        """Message id the detector last fired at, for chats not seen since startup"""
+        return 0
+
+    def observe(self, chat_id: int, message_id: int, text: str) -> bool:
+        """Count the message and return whether the detector should fire"""
+        hit = self.matches(text)
+        window = self.windows.get(chat_id)
+        if window is None:
+            window = self.windows[chat_id] = SlidingWindow(self.window)
+        count = window.push(hit)
+        if not hit or count < self.threshold or chat_id in self.firing:
+            return False
+        if chat_id not in self.last_fired:
+            self.last_fired[chat_id] = self.load_last_fired(chat_id)
+        if message_id - self.last_fired[chat_id] < self.cooldown:
+            return False
+        self.firing.add(chat_id)
+        return True
+
+    def record_fired(self, chat_id: int, message_id: int):
+        """Start the cooldown; called only once `fire` has succeeded"""
+        self.last_fired[chat_id] = message_id
+
+    @abstractmethod
+    async def fire(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        pass
+
+class LaughDetector(Detector):
+    """
+    When there's a lot of laughing in the chat, post a laugh GIF.
+    GIF URLs come from a background-refilled Giphy pool. Once sent, a GIF's Telegram file id is
+    kept, and when enough are known most sends pick one of them, which needs neither Giphy nor
+    Telegram fetching the GIF from its URL.
+    """
+
+    name = "laugh"
+    pattern = LAUGHTER
+    tag = 'laugh'
+    lastFiredKey = 'last_laugh_gif_message_id'
+
+    def __init__(self, bot):
+        super().__init__()
+        self.logger = bot.logger
+        self.db = bot.db
+        self.giphy = GiphyService(http=bot.http)
+        # Share of sends that reuse a known GIF, once at least `reuse_min` are known
+        self.reuse_ratio = float(os.getenv('GIPHY_REUSE_RATIO', '0.8'))
+        self.reuse_min = int(os.getenv('GIPHY_REUSE_MIN', '5'))
+        # Known GIFs kept; the oldest are forgotten past this
+        self.reuse_max = int(os.getenv('GIPHY_REUSE_MAX', '50'))
+        self.sent_gifs = None
+
+    def start(self):
+        self.giphy.warm(self.tag)
+
+    async def stop(self):
+        await self.giphy.close()
+
+    def load_last_fired(self, chat_id: int) -> int:
+        # Persisted so a restart does not reset the cooldown
+        return int(self.db.get_setting(chat_id, self.lastFiredKey, '0'))
+
+    async def fire(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        chat_id = update.message.chat_id
+        await self.send_gif(context.bot, chat_id)
+        self.db.set_setting(chat_id, self.lastFiredKey, str(update.message.message_id))
+        self.logger.info(f"Laugh GIF sent in chat {chat_id}. Next gif allowed after {self.cooldown} more messages.")
+
+    async def send_gif(self, telegram_bot, chat_id: int):
+        if self.sent_gifs is None:
+            self.sent_gifs = deque(self.db.get_telegram_files(f"giphy:{self.tag}:"))
+            self.forget_oldest_gifs()
+        if len(self.sent_gifs) >= self.reuse_min and random.random() < self.reuse_ratio:
+            key, file_id = random.choice(self.sent_gifs)
+            try:
+                await telegram_bot.send_animation(chat_id=chat_id, animation=file_id)
+                metrics.increment('giphy_file_id.hit')
+                return
+            except BadRequest as e:
+                self.logger.warning(f"Stored GIF file id is no longer valid, fetching a new GIF: {e}")
+                self.db.delete_telegram_file_id(key)
+                self.sent_gifs.remove((key, file_id))
+        metrics.increment('giphy_file_id.miss')
+
+        gif_url = await self.giphy.next_gif(self.tag)
+        if not gif_url:
+            return
+        sent = await telegram_bot.send_animation(chat_id=chat_id, animation=gif_url)
+        attachment = sent.animation or sent.document
+        if attachment:
+            key = f"giphy:{self.tag}:{gif_url}"
+            self.db.store_telegram_file_id(key, attachment.file_id)
+            self.sent_gifs.append((key, attachment.file_id))
+            self.forget_oldest_gifs()
+
+    def forget_oldest_gifs(self):
+        while len(self.sent_gifs) > self.reuse_max:
+            key, _ = self.sent_gifs.popleft()
+            self.db.delete_telegram_file_id(key)
+
+class DetectorRegistry:
+    """Runs every registered detector over each text message"""
+
+    def __init__(self, bot):
+        self.logger = bot.logger
+        self.detectors: list[Detector] = []
+
+    def register(self, detector: Detector):
+        self.detectors.append(detector)
+
+    def start(self):
+        for detector in self.detectors:
+            detector.start()
+
+    async def stop(self):
+        for detector in self.detectors:
+            await detector.stop()
+
+    def observe(self, message) -> list[Detector]:
+        """Count a text message in every detector and return those that should fire on it"""
+        due = []
+        for detector in self.detectors:
+            try:
+                if detector.observe(message.chat_id, message.message_id, message.text):
+                    due.append(detector)
+            except Exception as e:
+                self.logger.error(f"Error in {detector.name} detector: {e}")
+        return due
+
+    async def fire(self, detectors: list[Detector], update: Update, context: ContextTypes.DEFAULT_TYPE):
+        message = update.message
+        for detector in detectors:
+            try:
+                await detector.fire(update, context)
+                detector.record_fired(message.chat_id, message.message_id)
+            except Exception as e:
+                self.logger.error(f"Error in {detector.name} detector: {e}")
+            finally:
+                detector.firing.discard(message.chat_id)
+
+    def release(self, detectors: list[Detector], chat_id: int):
+        """Forget fires that were dropped before they ran"""
+        for detector in detectors:
+            detector.firing.discard(chat_id)
@@ -0,0 +1,38 @@
+import re
+import unicodedata
+
+_word = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?")
+_url = re.compile(r'https?://\S+|www\.\S+|@\w+')
+
+# Frequent English words, chat words included; a Latin-script message made up mostly of
+# these is taken to be English
+ENGLISH_WORDS = frozenset("""
+a about after all also am an and any are as at back be because been but by can come could
+day did do does don't for from get go going good got had has have he her here him his how
+i i'm if in into is it it's just know like lol look make me more my no not now of off ok okay
+on one only or other our out over people please really right said say see she so some than
+thank thanks that that's the their them then there these they think this time to today too
+up us very want was way we well were what when where which who why will with would yeah yes
+you you're your omg haha hahaha hi hey hello bye sure cool nice great sorry
+""".split())
+
+def normalize(text: str) -> str:
+    """Canonical form of a message for caching: Unicode NFC with whitespace collapsed"""
+    return " ".join(unicodedata.normalize('NFC', text).split())
+
+def needs_translation(text: str, target_language: str) -> bool:
+    """
+    Cheap local check of whether a message could need translating to `target_language`.
+    Messages without letters never do. For English, Latin-script messages made up mostly of
+    common English words are skipped; anything in another script, or any other Latin text
+    (which may be another language or Greeklish), is left to the translation API.
+    """
+    words = _word.findall(_url.sub(' ', text).lower())
+    if not words:
+        return False
+    if target_language != 'en':
+        return True
+    if any(ord(c) >= 0x250 for word in words for c in word):
+        return True
+    english = sum(word in ENGLISH_WORDS for word in words)
+    return english * 2 < len(words)
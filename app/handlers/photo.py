@@ -1,7 +1,16 @@
+import asyncio
+import time
+
 from telegram import Update, ReactionTypeEmoji
 from telegram.ext import ContextTypes
 
-from .utils import get_file_path, store_file
+from app.deadline import Deadline, TIMEOUT_REPLY
+from app.brain.image_preprocessing import select_photo_size, DEFAULT_MAX_SIDE
+from app import metrics
+
+# Photos of an album arrive as separate updates; once none is still queued or downloading, wait this
+# long after the last one before analyzing
+MEDIA_GROUP_WINDOW = 1.5
 
 class PhotoHandler:
     def __init__(self, bot):
@@ -9,29 +18,107 @@ class PhotoHandler:
         self.logger = bot.logger
         self.get_brain = bot.get_brain
         self.db = bot.db
+        self.media = bot.media
+        self.enricher = bot.enricher
+        self.dispatcher = bot.dispatcher
+        self.media_groups = {}
 
     async def __call__(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        deadline = Deadline.of(context)
         chat_id = update.effective_chat.id
         username = update.effective_user.username or update.effective_user.first_name
         caption = update.message.caption or ""
         self.logger.info(f"Received photo from {username} (chat_id: {chat_id}) with caption: {caption}")
 
         self.logger.debug(f"Photo size: {[photo.file_size for photo in update.message.photo]}")
-        photo = update.message.photo[-1]
-        photo_file = await context.bot.get_file(photo.file_id)
-        photo_bytes = await photo_file.download_as_bytearray()
-        file_path = get_file_path("photo", update.message.chat_id, update.message.message_id)
-        store_file(file_path, photo_bytes)
-        self.logger.info(f"Stored photo file at {file_path}")
+        # Download only the smallest size that still satisfies the chat's vision backend
+        max_side = getattr(self.get_brain(chat_id), 'IMAGE_MAX_SIDE', DEFAULT_MAX_SIDE)
+        photo = select_photo_size(update.message.photo, max_side)
+        try:
+            digest = await self.media.receive("photo", chat_id, update.message.message_id, photo, context.bot, "image/jpeg")
+            self.logger.info(f"Stored photo as {digest}" if digest else "Recorded photo for on-demand download")
+            self.enricher.submit("photo", chat_id, update.message.message_id, context.bot)
+        finally:
+            if update.message.media_group_id:
+                self.collect_media_group(update, context)
+        if update.message.media_group_id:
+            return
+
+        await self.analyze(update, context, [update], caption, deadline)
+
+    async def expect(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Note an album photo as soon as it arrives, before it waits for a dispatcher worker and
+        its download, so the album is not analyzed while some of its photos are still on the way
+        """
+        if update.message.media_group_id:
+            self.media_group(update.message.media_group_id, context)['pending'] += 1
+
+    async def discard(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Stop waiting for an album photo the dispatcher shed"""
+        group = self.media_groups.get(update.message.media_group_id)
+        if group:
+            group['pending'] = max(0, group['pending'] - 1)
+            group['last_seen'] = time.monotonic()
+
+    def media_group(self, group_id: str, context: ContextTypes.DEFAULT_TYPE) -> dict:
+        """The group being collected; the first photo of the group schedules a single analysis for all of them"""
+        group = self.media_groups.get(group_id)
+        if group is None:
+            # Photos still expected once the deadline runs out are left out of the analysis
+            group = self.media_groups[group_id] = {'photos': [], 'context': context, 'pending': 0,
+                                                   'deadline': Deadline(), 'last_seen': time.monotonic()}
+            group['task'] = asyncio.create_task(self.flush_media_group(group_id))
+        return group
+
+    def collect_media_group(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Buffer an album photo once it has been received"""
+        group_id = update.message.media_group_id
+        group = self.media_group(group_id, context)
+        group['photos'].append(update)
+        group['pending'] = max(0, group['pending'] - 1)
+        group['last_seen'] = time.monotonic()
+        self.logger.debug(f"Collected photo {len(group['photos'])} of media group {group_id}")
 
+    async def flush_media_group(self, group_id: str):
+        group = self.media_groups[group_id]
+        while True:
+            wait = group['last_seen'] + MEDIA_GROUP_WINDOW - time.monotonic()
+            if wait <= 0 and (not group['pending'] or group['deadline'].expired):
+                break
+            await asyncio.sleep(max(wait, 0.1))
+        del self.media_groups[group_id]
+        if not group['photos']:
+            return
+
+        photos = sorted(group['photos'], key=lambda item: item.message.message_id)
+        # Telegram puts the album caption on one of the photos only, reply to that one
+        captioned = [photo for photo in photos if photo.message.caption]
+        update = captioned[0] if captioned else photos[0]
+        caption = update.message.caption or ""
+        self.logger.info(f"Media group {group_id} complete with {len(photos)} photos, caption: {caption}")
+
+        # Analyze as a job of its own, in the chat's turn and within the bounded worker pool
+        async def analyze_album(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            await self.analyze(update, context, photos, caption, Deadline.of(context))
+        await self.dispatcher.submit(analyze_album, update, group['context'])
+
+    async def analyze(self, update: Update, context: ContextTypes.DEFAULT_TYPE, photos: list[Update], caption: str, deadline: Deadline):
+        chat_id = update.effective_chat.id
         caption_lower = caption.lower().strip()
         if not (caption_lower == 'b' or caption_lower == 'bot' or caption_lower.startswith('b ') or caption_lower.startswith('bot ')):
             self.logger.info("Skipping photo analysis - caption must be 'b'/'bot' or start with 'b '/'bot '")
             return
 
         await update.message.set_reaction([ReactionTypeEmoji("👀")])
+        images = [(await self.media.fetch(context.bot, chat_id, photo.message.message_id))[0] for photo in photos]
+        images = [image for image in images if image]
+        if not images:
+            self.logger.error(f"No image data available for message {update.message.message_id}")
+            await update.message.set_reaction([ReactionTypeEmoji("🤷‍♂️")])
+            return
         if caption_lower == 'b' or caption_lower == 'bot':
-            query = "Please analyze this image."
+            query = "Please analyze this image." if len(images) == 1 else "Please analyze these images."
         elif caption_lower.startswith('bot '):
             query = caption[4:].strip()
         else:
@@ -41,13 +128,16 @@ class PhotoHandler:
         contexts = context_setting.split("\n") if context_setting else []
         system_prompt = "\n".join([f"System: {ctx}" for ctx in contexts]) + "\n" if contexts else ""
         brain = self.get_brain(chat_id)
-        response = await brain.process_image(photo_bytes, query, system_prompt)
+        start = time.perf_counter()
+        response = await deadline.run("vision", brain.process_images(images, query, system_prompt, deadline=deadline), TIMEOUT_REPLY)
+        metrics.observe(f"vision.{type(brain).__name__}", time.perf_counter() - start)
 
+        label = "Photo" if len(images) == 1 else f"Album of {len(images)} photos"
         self.db.store_message(
             chat_id=chat_id,
             user_id=update.effective_user.id,
             username="bot",
-            message_text=f"[Photo with caption: {caption}]:{response}",
+            message_text=f"[{label} with caption: {caption}]:{response}",
             timestamp=update.message.date,
             message_id=update.message.message_id
         )
@@ -58,4 +148,3 @@ class PhotoHandler:
 
         await update.message.reply_text(response)
         await update.message.set_reaction([])
-
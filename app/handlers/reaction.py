@@ -1,7 +1,7 @@
 from telegram import Update, ReactionTypeEmoji
 from telegram.ext import ContextTypes
 
-from app.handlers.utils import try_get_file
+from app.deadline import Deadline, TIMEOUT_REPLY
 
 class ReactionHandler:
     categories = ["text", "photo", "voice"]
@@ -12,8 +12,11 @@ class ReactionHandler:
         self.get_brain = bot.get_brain
         self.voice = bot.voice
         self.db = bot.db
+        self.media = bot.media
+        self.enricher = bot.enricher
 
     async def __call__(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        deadline = Deadline.of(context)
         self.logger.info(f"Received update: {update}")
         reaction = update.message_reaction.new_reaction
         self.logger.info(f"Reaction: {reaction}")
@@ -21,7 +24,7 @@ class ReactionHandler:
             self.logger.info(f"don't handle reaction {update.message_reaction}")
             return
 
-        subject, category = self.get_categorized_subject(update.effective_chat.id, update.message_reaction.message_id)
+        subject, category = await self.get_categorized_subject(context.bot, update.effective_chat.id, update.message_reaction.message_id)
         if category not in self.categories:
             self.logger.warning(f"Unknown category [{category}] for file {subject}")
             try:
@@ -48,14 +51,15 @@ class ReactionHandler:
         if category == "text":
             self.logger.info(f"Processing text reaction for message ID {update.message_reaction.message_id}. Context: {contexts}")
             brain = self.get_brain(update.effective_chat.id)
-            response = brain.process("Use this message as a query: " + subject, system_prompt)
+            response = await deadline.call("brain", TIMEOUT_REPLY, brain.process, "Use this message as a query: " + subject, system_prompt=system_prompt, deadline=deadline)
         elif category == "photo":
             self.logger.info(f"Processing photo reaction for message ID {update.message_reaction.message_id}")
             brain = self.get_brain(update.effective_chat.id)
-            response = await brain.process_image(subject, "Explain this image", system_prompt)
+            media = self.db.get_media(update.effective_chat.id, update.message_reaction.message_id)
+            response = await self.enricher.describe_photo(brain, subject, system_prompt, self.media.content_key(media) if media else None, deadline=deadline)
         elif category == "voice":
             self.logger.info(f"Processing voice reaction for message ID {update.message_reaction.message_id}")
-            response = await self.voice.transcribe_voice(subject)
+            response = await self.voice.transcribe_voice(subject, deadline=deadline, chat_id=update.effective_chat.id)
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
             text=response,
@@ -67,11 +71,14 @@ class ReactionHandler:
             reaction=[]
         )
 
-    def get_categorized_subject(self, chat_id: int, message_id: int) -> tuple[str, str]:
+    async def get_categorized_subject(self, bot, chat_id: int, message_id: int) -> tuple[str, str]:
+        media = self.db.get_media(chat_id, message_id)
+        if media:
+            return await self.media.read(bot, media), media['category']
+
         text = self.db.get_message_text(chat_id, message_id)
         if text != "":
             return text, "text"
 
-        file, category = try_get_file(chat_id, message_id)
-        return file, category
+        return await self.media.load_legacy(chat_id, message_id)
 
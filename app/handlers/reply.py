@@ -1,17 +1,23 @@
+import time
+
 from telegram import Update, ReactionTypeEmoji
+from telegram.error import BadRequest
 from telegram.ext import ContextTypes
 
-from app.handlers.utils import get_file_path, load_file
+from app.deadline import Deadline, TIMEOUT_REPLY
+from app import metrics
 
 class ReplyHandler:
     def __init__(self, bot):
         self.logger = bot.logger
         self.db = bot.db
+        self.media = bot.media
         self.get_brain = bot.get_brain
         self.voice = bot.voice
         self.tts = bot.tts
 
     async def __call__(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        deadline = Deadline.of(context)
         chat_id = update.message.chat_id
         user_id = update.message.from_user.id
         username = update.message.from_user.username
@@ -31,29 +37,34 @@ class ReplyHandler:
 
         if update.message.reply_to_message.photo:
             self.logger.info(f"Processing photo reply for message ID {update.message.reply_to_message.message_id}")
-            file_path = get_file_path("photo", chat_id, update.message.reply_to_message.message_id)
-            file = load_file(file_path)
+            file, _ = await self.media.fetch(context.bot, chat_id, update.message.reply_to_message.message_id)
 
             brain = self.get_brain(update.effective_chat.id)
             context_setting = self.db.get_setting(chat_id, "context", "")
             contexts = context_setting.split("\n") if context_setting else []
             system_prompt = "\n".join([f"System: {ctx}" for ctx in contexts]) + "\n" if contexts else ""
-            response = await brain.process_image(file, text, system_prompt)
+            response = await deadline.run("vision", brain.process_image(file, text, system_prompt, deadline=deadline), TIMEOUT_REPLY)
         elif update.message.reply_to_message.voice:
-            file_path = get_file_path("voice", chat_id, update.message.reply_to_message.message_id)
-            file = load_file(file_path)
+            file, _ = await self.media.fetch(context.bot, chat_id, update.message.reply_to_message.message_id)
 
             self.logger.info(f"Processing voice reply for message ID {update.message.reply_to_message.message_id}")
-            transcription = await self.voice.transcribe_voice(file)
+            transcription = await self.voice.transcribe_voice(file, deadline=deadline, chat_id=chat_id)
             brain = self.get_brain(update.effective_chat.id)
             context_setting = self.db.get_setting(chat_id, "context", "")
             contexts = context_setting.split("\n") if context_setting else []
             system_prompt = "\n".join([f"System: {ctx}" for ctx in contexts]) + "\n" if contexts else ""
-            response = brain.process("here's a transcription " + transcription + " and here's the query: " + text, system_prompt)
+            response = await deadline.call("brain", TIMEOUT_REPLY, brain.process, "here's a transcription " + transcription + " and here's the query: " + text, system_prompt=system_prompt, deadline=deadline)
         elif reply == "tts":
             text = update.message.reply_to_message.text
-            speech = await self.tts.generate_speech(text)
-            await update.message.reply_voice(speech)
+            if not await self.reply_cached_voice(update, text):
+                sent_parts = []
+                # Long texts may arrive in two parts, so listening can start before synthesis is done
+                async for speech in self.tts.generate_speech_parts(text, deadline=deadline, early=self.tts.send_first_chunk):
+                    sent_parts.append(await self.send_voice(update, speech))
+                if not sent_parts:
+                    await update.message.reply_text(TIMEOUT_REPLY if deadline.expired else "Could not generate speech.")
+                elif len(sent_parts) == 1:
+                    self.remember_voice(text, sent_parts[0])
             await update.message.set_reaction([])
             return
 
@@ -62,6 +73,37 @@ class ReplyHandler:
         await update.message.set_reaction([])
 
 
+    async def reply_cached_voice(self, update: Update, text: str) -> bool:
+        """Resend speech for `text` by its Telegram file id if it was sent before; False if it has to be generated"""
+        key = self.tts.cache_key(text)
+        file_id = self.db.get_telegram_file_id(f"tts:{key}") if key else None
+        if not file_id:
+            metrics.increment('tts_file_id.miss')
+            return False
+        try:
+            await update.message.reply_voice(file_id)
+            metrics.increment('tts_file_id.hit')
+            return True
+        except BadRequest as e:
+            self.logger.warning(f"Stored voice file id is no longer valid, generating again: {e}")
+            self.db.delete_telegram_file_id(f"tts:{key}")
+            return False
+
+    async def send_voice(self, update: Update, speech: bytes):
+        """Send synthesized speech, recording bytes sent and send latency per provider"""
+        provider = self.tts.current_provider
+        start = time.perf_counter()
+        sent = await update.message.reply_voice(speech)
+        metrics.observe(f"tts.send.{provider}", time.perf_counter() - start)
+        metrics.increment(f"tts.bytes.{provider}", len(speech))
+        return sent
+
+    def remember_voice(self, text: str, sent):
+        key = self.tts.cache_key(text)
+        attachment = sent.voice or sent.audio
+        if key and attachment:
+            self.db.store_telegram_file_id(f"tts:{key}", attachment.file_id)
+
     def get_reply_to_bot(self, text:str, context: ContextTypes.DEFAULT_TYPE) -> str:
         if text is None or text == "":
             return ""
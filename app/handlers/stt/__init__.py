@@ -0,0 +1,3 @@
+from .stt_handler import STTHandler
+
+__all__ = ['STTHandler']
@@ -0,0 +1,22 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+
+class BaseSTTProvider(ABC):
+    """Base class for all STT providers"""
+
+    @abstractmethod
+    async def transcribe(self, audio: bytes, timeout: Optional[float] = None) -> Optional[str]:
+        """Transcribe OGG/Opus audio, giving up on the provider call after `timeout` seconds. None on failure"""
+        pass
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """Get the name of the STT provider"""
+        pass
+
+    @property
+    @abstractmethod
+    def model_id(self) -> str:
+        """Identify the model and prompt version, transcripts are cached per model_id"""
+        pass
@@ -0,0 +1,67 @@
+import io
+import os
+from typing import Optional
+
+from google.genai import types
+
+from app.brain.gemini import get_client
+from app.logger import setup_logger
+from .base import BaseSTTProvider
+
+class GeminiSTTProvider(BaseSTTProvider):
+    """Gemini multimodal transcription, on the client shared with the Gemini brain"""
+
+    # Bump when the transcription prompt changes, so cached transcripts are not reused
+    PROMPT_VERSION = 1
+    # Audio above this size goes through the Files API instead of inline in the request
+    INLINE_MAX_BYTES = int(os.getenv('VOICE_INLINE_MAX_BYTES', str(8 * 1024 * 1024)))
+    PROMPT = """Please transcribe the following audio.
+            The audio contains Greek speech with some English technical terms.
+            Please preserve any English words exactly as spoken and transcribe the Greek text properly.
+            Return ONLY the transcription, no additional text or explanation."""
+
+    def __init__(self):
+        self.logger = setup_logger()
+        api_key = os.getenv('GEMINI_API_KEY')
+        if not api_key:
+            self.logger.error("GEMINI_API_KEY environment variable is not set")
+            raise ValueError("GEMINI_API_KEY environment variable is not set")
+        self.client = get_client()
+        self.model_name = os.getenv('TRANSCRIPTION_MODEL', 'gemini-2.5-flash')
+        self.logger.info(f"Gemini STT provider initialized with {self.model_name}")
+
+    @property
+    def name(self) -> str:
+        return "gemini"
+
+    @property
+    def model_id(self) -> str:
+        return f"{self.model_name}:v{self.PROMPT_VERSION}"
+
+    async def transcribe(self, audio: bytes, timeout: Optional[float] = None) -> Optional[str]:
+        uploaded = None
+        try:
+            if len(audio) > self.INLINE_MAX_BYTES:
+                # Uploaded as raw bytes, the request then only carries a reference to the file
+                uploaded = await self.client.aio.files.upload(file=io.BytesIO(audio),
+                                                              config=types.UploadFileConfig(mime_type="audio/ogg"))
+                part = types.Part.from_uri(file_uri=uploaded.uri, mime_type=uploaded.mime_type)
+            else:
+                # Inline parts only accept bytes, and are base64-encoded into the request anyway
+                part = types.Part.from_bytes(data=bytes(audio), mime_type="audio/ogg")
+
+            config = types.GenerateContentConfig(http_options=types.HttpOptions(timeout=max(1, int(timeout * 1000)))) if timeout else None
+            response = await self.client.aio.models.generate_content(model=self.model_name, contents=[self.PROMPT, part], config=config)
+            transcript = response.text.strip()
+            self.logger.info(f"Successfully transcribed voice message using Gemini: {transcript[:100]}...")
+            return transcript
+
+        except Exception as e:
+            self.logger.error(f"Error transcribing voice message with Gemini: {str(e)}")
+            return None
+        finally:
+            if uploaded is not None:
+                try:
+                    await self.client.aio.files.delete(name=uploaded.name)
+                except Exception as e:
+                    self.logger.warning(f"Could not delete uploaded audio {uploaded.name}: {e}")
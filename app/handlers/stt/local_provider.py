@@ -0,0 +1,54 @@
+import asyncio
+import json
+import os
+from typing import Optional
+
+from ffmpeg.asyncio import FFmpeg
+
+from app.logger import setup_logger
+from .base import BaseSTTProvider
+
+SAMPLE_RATE = 16000
+
+class LocalSTTProvider(BaseSTTProvider):
+    """Offline transcription with a Vosk model, no network or API key needed"""
+
+    def __init__(self):
+        self.logger = setup_logger()
+        self._model_path = os.getenv('VOSK_MODEL_PATH')
+        if not self._model_path or not os.path.isdir(self._model_path):
+            raise ValueError("VOSK_MODEL_PATH is not set to a Vosk model directory")
+        try:
+            import vosk
+        except ImportError:
+            raise ValueError("vosk is not installed")
+        vosk.SetLogLevel(-1)
+        self._vosk = vosk
+        self._model = vosk.Model(self._model_path)
+        self.logger.info(f"Local STT provider initialized with Vosk model {self._model_path}")
+
+    @property
+    def name(self) -> str:
+        return "local"
+
+    @property
+    def model_id(self) -> str:
+        return f"vosk:{os.path.basename(os.path.normpath(self._model_path))}"
+
+    def _recognize(self, pcm: bytes) -> str:
+        recognizer = self._vosk.KaldiRecognizer(self._model, SAMPLE_RATE)
+        recognizer.AcceptWaveform(pcm)
+        return json.loads(recognizer.FinalResult()).get('text', '')
+
+    async def transcribe(self, audio: bytes, timeout: Optional[float] = None) -> Optional[str]:
+        try:
+            pcm = await (FFmpeg().input("pipe:0")
+                         .output("pipe:1", {"ac": 1, "ar": SAMPLE_RATE}, f="s16le")
+                         .execute(audio, timeout=timeout))
+            transcript = await asyncio.wait_for(asyncio.to_thread(self._recognize, pcm), timeout)
+            self.logger.info(f"Successfully transcribed voice message locally: {transcript[:100]}...")
+            return transcript
+
+        except Exception as e:
+            self.logger.error(f"Error transcribing voice message locally: {str(e)}")
+            return None
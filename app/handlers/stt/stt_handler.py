@@ -0,0 +1,96 @@
+import os
+import time
+from collections import deque
+from typing import Optional
+
+from app import metrics
+from app.logger import setup_logger
+from .base import BaseSTTProvider
+from .gemini_provider import GeminiSTTProvider
+from .whisper_provider import WhisperSTTProvider
+from .local_provider import LocalSTTProvider
+
+sttProviderKey = 'stt_provider'
+
+class ProviderStats:
+    """Rolling latency and error rate over the last `window` requests to a provider"""
+
+    def __init__(self, window: int):
+        self.samples = deque(maxlen=window)
+        self.last_error = 0.0
+
+    def record(self, seconds: float, ok: bool):
+        self.samples.append((seconds, ok))
+        if not ok:
+            self.last_error = time.monotonic()
+
+    @property
+    def latency(self) -> float:
+        successes = [seconds for seconds, ok in self.samples if ok]
+        return sum(successes) / len(successes) if successes else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples) if self.samples else 0.0
+
+class STTHandler:
+    """
+    Main STT handler that manages multiple providers.
+    Each request goes to the healthy provider with the lowest rolling latency (untried providers
+    first, so all of them get measured), falling back to the next one on failure. A provider is
+    unhealthy while its error rate is above STT_MAX_ERROR_RATE, until STT_RETRY_AFTER_SECONDS have
+    passed since its last error. Chats can pin a provider with /stt.
+    """
+
+    def __init__(self, db=None):
+        self.logger = setup_logger()
+        self.db = db
+        self.providers: dict[str, BaseSTTProvider] = {}
+        window = int(os.getenv('STT_STATS_WINDOW', '20'))
+        self.max_error_rate = float(os.getenv('STT_MAX_ERROR_RATE', '0.5'))
+        self.retry_after = float(os.getenv('STT_RETRY_AFTER_SECONDS', '60'))
+
+        for name, provider_cls in (('gemini', GeminiSTTProvider), ('whisper', WhisperSTTProvider), ('local', LocalSTTProvider)):
+            try:
+                self.providers[name] = provider_cls()
+            except Exception as e:
+                self.logger.warning(f"Could not initialize {name} STT: {str(e)}")
+
+        self.stats = {name: ProviderStats(window) for name in self.providers}
+        self.logger.info(f"STT handler initialized with providers: {', '.join(self.providers.keys())}")
+
+    def get_available_providers(self) -> list[str]:
+        """Get list of available providers"""
+        return list(self.providers.keys())
+
+    def model_ids(self) -> list[str]:
+        """Model ids of all available providers, a cached transcript from any of them can be reused"""
+        return [provider.model_id for provider in self.providers.values()]
+
+    def is_healthy(self, name: str) -> bool:
+        stats = self.stats[name]
+        return stats.error_rate <= self.max_error_rate or time.monotonic() - stats.last_error > self.retry_after
+
+    def candidates(self, chat_id: int = None) -> list[str]:
+        """Providers in the order they should be tried for a chat"""
+        ranked = sorted(self.providers, key=lambda name: (not self.is_healthy(name), self.stats[name].latency))
+        pinned = self.db.get_setting(chat_id, sttProviderKey, None) if self.db is not None and chat_id is not None else None
+        if pinned in self.providers:
+            ranked.remove(pinned)
+            ranked.insert(0, pinned)
+        return ranked
+
+    async def transcribe(self, audio: bytes, chat_id: int = None, timeout: Optional[float] = None) -> tuple[Optional[str], Optional[str]]:
+        """Transcribe with the best provider, falling back to the others. Returns (transcript, model_id)"""
+        for name in self.candidates(chat_id):
+            provider = self.providers[name]
+            start = time.perf_counter()
+            transcript = await provider.transcribe(audio, timeout)
+            elapsed = time.perf_counter() - start
+            self.stats[name].record(elapsed, transcript is not None)
+            if transcript is not None:
+                metrics.observe(f"stt.{name}", elapsed)
+                return transcript, provider.model_id
+            metrics.increment(f"stt.{name}.errors")
+            self.logger.warning(f"STT provider {name} failed, trying the next one")
+        return None, None
@@ -0,0 +1,47 @@
+import os
+from typing import Optional
+
+from openai import AsyncOpenAI
+
+from app.logger import setup_logger
+from .base import BaseSTTProvider
+
+class WhisperSTTProvider(BaseSTTProvider):
+    """OpenAI Whisper transcription"""
+
+    def __init__(self):
+        self.logger = setup_logger()
+        api_key = os.getenv('OPENAI_API_KEY')
+        if not api_key:
+            self.logger.error("OPENAI_API_KEY environment variable is not set")
+            raise ValueError("OPENAI_API_KEY environment variable is not set")
+        self.client = AsyncOpenAI(api_key=api_key)
+        self._model = 'whisper-1'
+        # Voice notes are mostly Greek; an explicit language avoids misdetection on short clips
+        self._language = os.getenv('WHISPER_LANGUAGE', 'el')
+        self.logger.info(f"Whisper STT provider initialized with {self._model} model")
+
+    @property
+    def name(self) -> str:
+        return "whisper"
+
+    @property
+    def model_id(self) -> str:
+        return f"{self._model}:{self._language}"
+
+    async def transcribe(self, audio: bytes, timeout: Optional[float] = None) -> Optional[str]:
+        try:
+            response = await self.client.audio.transcriptions.create(
+                model=self._model,
+                # A stored voice note's memory map is streamed into the request as it is
+                file=("voice.ogg", audio, "audio/ogg"),
+                language=self._language,
+                timeout=timeout
+            )
+            transcript = response.text.strip()
+            self.logger.info(f"Successfully transcribed voice message using Whisper: {transcript[:100]}...")
+            return transcript
+
+        except Exception as e:
+            self.logger.error(f"Error transcribing voice message with Whisper: {str(e)}")
+            return None
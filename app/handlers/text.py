@@ -2,8 +2,6 @@ from telegram import Update
 from telegram.ext import ContextTypes
 from datetime import datetime, timezone, timedelta
 
-from app.handlers.utils import contains_laughter
-from app.services.giphy import GiphyService
 
 class TextHandler:
     def __init__(self, bot):
@@ -12,56 +10,38 @@ class TextHandler:
         self.db = bot.db
         self.translator = bot.translator
         self.translation_is_enabled = bot.translation_is_enabled
-        self.giphy = GiphyService()
+        self.detectors = bot.detectors
+        self.dispatcher = bot.dispatcher
+
+    async def store(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Keep the message in the chat history"""
+        message = update.message
+        self.logger.info(f"Storing message from user {message.from_user.username} in chat {message.chat_id}/{message.message_id}: {message.text}")
+        self.db.store_message(message.chat_id, message.from_user.id, message.from_user.username, message.text, message.date, message_id=message.message_id)
 
     async def __call__(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Store the message right away. Only work that replies, a translation or a detector firing,
+        waits in the chat's dispatcher queue, and it is dropped quietly when the chat is busy.
+        """
         chat_id = update.message.chat_id
-        user_id = update.message.from_user.id
-        username = update.message.from_user.username
-        text = update.message.text
-        date = update.message.date
-        message_id = update.message.message_id
 
-        self.logger.info(f"Storing message from user {username} in chat {chat_id}/{message_id}: {text}")
-        self.db.store_message(chat_id, user_id, username, text, date, message_id=message_id)
+        await self.store(update, context)
 
         if self.translator and self.translation_is_enabled(chat_id):
-            translated = await self.translator.translate(text, target_language="en")
-            self.logger.debug(f"Translation result: {translated}")
-            if translated and translated['source_language'] != translated['destination_language']:
-                await update.message.reply_text(translated['translated_text'])
-
-        # Laugh detector: when there's a lot of laughing in the chat, post a laugh GIF
-        try:
-            if contains_laughter(text):
-                # Fetch recent messages (including current) and count laughter occurrences
-                recent = self.db.get_recent_messages(chat_id, limit=5)  # Reduced window to 5 messages
-                laugh_count = 0
-                for msg in recent:
-                    if msg.get('message_text') and contains_laughter(str(msg['message_text'])):
-                        laugh_count += 1
-                # Include current message explicitly if not yet persisted in recent snapshot
-                if laugh_count == 0 and contains_laughter(text):
-                    laugh_count += 1
-
-                # Threshold and message-count-based antispam
-                threshold = 3  # Trigger if 3 out of 5 messages contain laughter
-                antispam_messages = 10  # Wait for 10 new messages before allowing another gif
-
-                # Check when the last gif was sent (by message_id)
-                last_gif_message_id = int(self.db.get_setting(chat_id, 'last_laugh_gif_message_id', '0'))
-                cooldown_active = (message_id - last_gif_message_id) < antispam_messages
-
-                if laugh_count >= threshold and not cooldown_active:
-                    try:
-                        gif_url = await self.giphy.get_random_gif('laugh')
-                        if gif_url:
-                            await context.bot.send_animation(chat_id=chat_id, animation=gif_url)
-                        # Store the current message_id for antispam
-                        self.db.set_setting(chat_id, 'last_laugh_gif_message_id', str(message_id))
-                        self.logger.info(f"Laugh GIF sent in chat {chat_id}. Next gif allowed after {antispam_messages} more messages.")
-                    except Exception as e:
-                        self.logger.error(f"Failed to send laugh GIF: {e}")
-        except Exception as e:
-            self.logger.error(f"Error in laugh detection: {e}")
-
+            await self.dispatcher.submit(self.translate, update, context, quiet=True)
+
+        due = self.detectors.observe(update.message)
+        if due:
+            async def fire(update: Update, context: ContextTypes.DEFAULT_TYPE):
+                await self.detectors.fire(due, update, context)
+
+            async def release(update: Update, context: ContextTypes.DEFAULT_TYPE):
+                self.detectors.release(due, chat_id)
+            await self.dispatcher.submit(fire, update, context, on_shed=release, quiet=True)
+
+    async def translate(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        translated = await self.translator.translate(update.message.text, target_language="en")
+        self.logger.debug(f"Translation result: {translated}")
+        if translated and translated['source_language'] != translated['destination_language']:
+            await update.message.reply_text(translated['translated_text'])
@@ -1,20 +1,68 @@
-import aiohttp
+import asyncio
+import os
+from collections import OrderedDict
 from typing import Optional
+from app import metrics
+from app.handlers.language import needs_translation, normalize
 from app.logger import setup_logger
+from app.services.http import HTTPSessionManager
 
 class TranslateHandler:
-    def __init__(self, api_url: str):
+    """
+    Client of the translation API.
+    Messages the local language check deems already in the target language are skipped, results
+    are kept in an LRU cache keyed by normalized text, and concurrent requests for the same text
+    share one API call. With TRANSLATE_BATCH_WINDOW_MS set, messages arriving within that window
+    are sent together to the service's /translate/batch endpoint; if the service does not have
+    one, batching switches itself off.
+    """
+
+    def __init__(self, api_url: str, http: Optional[HTTPSessionManager] = None):
         self.api_url = api_url
+        self.http = http or HTTPSessionManager()
         self.logger = setup_logger()
+        self.cache: OrderedDict[tuple[str, str], dict] = OrderedDict()
+        self.cache_size = int(os.getenv('TRANSLATE_CACHE_SIZE', '1000'))
+        self.in_flight: dict[tuple[str, str], asyncio.Future] = {}
+        self.batch_window = int(os.getenv('TRANSLATE_BATCH_WINDOW_MS', '0')) / 1000
+        self.batch_max = int(os.getenv('TRANSLATE_BATCH_MAX', '16'))
+        self.batch: list[tuple[str, str, asyncio.Future]] = []
+        self._flush_tasks = set()
         self.logger.info("Translation handler initialized")
 
     async def translate(self, text: str, target_language: str) -> Optional[dict]:
+        if not needs_translation(text, target_language):
+            metrics.increment('translate.skipped')
+            return None
+
+        key = (normalize(text), target_language)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            metrics.increment('translations.hit')
+            return self.cache[key]
+        if key in self.in_flight:
+            metrics.increment('translations.hit')
+            return await asyncio.shield(self.in_flight[key])
+        metrics.increment('translations.miss')
+
+        future = self.in_flight[key] = asyncio.get_running_loop().create_future()
+        response = None
         try:
-            response = await self._call_translation_api(text, target_language)
-            return response
+            if self.batch_window:
+                response = await self._queue_for_batch(key[0], target_language)
+            else:
+                response = await self._call_translation_api(key[0], target_language)
         except Exception as e:
             self.logger.error(f"Error translating text: {str(e)}")
-            return None
+        finally:
+            del self.in_flight[key]
+            future.set_result(response)
+
+        if response:
+            self.cache[key] = response
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return response
 
     async def _call_translation_api(self, text: str, target_language: str) -> Optional[dict]:
         payload = {
@@ -26,13 +74,67 @@ class TranslateHandler:
         headers = {
             "Content-Type": "application/json"
         }
-        async with aiohttp.ClientSession() as session:
-            async with session.post(self.api_url + "/translate", json=payload, headers=headers) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    return data
+        status, data = await self.http.request('translate', 'POST', self.api_url + "/translate", json=payload, headers=headers)
+        if status == 200:
+            return data
+        self.logger.error(f"Translation API error {status}: {data}")
+        return None
+
+    async def _queue_for_batch(self, text: str, target_language: str) -> Optional[dict]:
+        future = asyncio.get_running_loop().create_future()
+        self.batch.append((text, target_language, future))
+        if len(self.batch) >= self.batch_max:
+            # Full: later messages start a new batch while this one is sent right away
+            batch, self.batch = self.batch, []
+            self._spawn(self._send(batch))
+        elif len(self.batch) == 1:
+            self._spawn(self._flush_after(self.batch, self.batch_window))
+        return await future
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush_after(self, batch: list, delay: float):
+        """Send `batch` when its window ends, unless it filled up and was sent already"""
+        await asyncio.sleep(delay)
+        if batch is self.batch:
+            self.batch = []
+            await self._send(batch)
+
+    async def _send(self, batch: list):
+        by_language: dict[str, list] = {}
+        for text, target_language, future in batch:
+            by_language.setdefault(target_language, []).append((text, future))
+
+        for target_language, items in by_language.items():
+            try:
+                if len(items) == 1 or not self.batch_window:
+                    results = await asyncio.gather(*(self._call_translation_api(text, target_language) for text, _ in items))
                 else:
-                    error_text = await resp.text()
-                    self.logger.error(f"Translation API error {resp.status}: {error_text}")
-                    return None
+                    results = await self._call_batch_api([text for text, _ in items], target_language)
+            except Exception as e:
+                self.logger.error(f"Error translating batch: {str(e)}")
+                results = [None] * len(items)
+            for (_, future), result in zip(items, results):
+                if not future.done():
+                    future.set_result(result)
 
+    async def _call_batch_api(self, texts: list[str], target_language: str) -> list[Optional[dict]]:
+        payload = {
+            "texts": texts,
+            "dest": target_language,
+            "src": "auto",
+            "pronunciation": True
+        }
+        status, data = await self.http.request('translate', 'POST', self.api_url + "/translate/batch", json=payload)
+        if status == 200 and isinstance(data, list) and len(data) == len(texts):
+            metrics.increment('translate.batches')
+            return data
+        if status in (404, 405):
+            self.logger.warning("Translation API has no batch endpoint, turning batching off")
+            self.batch_window = 0
+        else:
+            self.logger.error(f"Translation API batch error {status}: {data}")
+        return await asyncio.gather(*(self._call_translation_api(text, target_language) for text in texts))
@@ -1,9 +1,15 @@
-import os
-import tempfile
+import asyncio
+import io
 from typing import Optional
 from gtts import gTTS
 from app.logger import setup_logger
 
+def _synthesize(text: str) -> bytes:
+    """Synthesize Greek speech with gTTS into an in-memory MP3"""
+    buffer = io.BytesIO()
+    gTTS(text=text, lang='el', slow=False).write_to_fp(buffer)
+    return buffer.getvalue()
+
 class TTSHandler:
     def __init__(self):
         """Initialize the TTS handler with gTTS"""
@@ -17,20 +23,8 @@ class TTSHandler:
         Note: Greek voice handles both Greek and English (with accent)
         """
         try:
-            # Create gTTS object with Greek voice
-            tts = gTTS(text=text, lang='el', slow=False)
-
-            # Save to temporary file
-            with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as tmp_file:
-                temp_filename = tmp_file.name
-                tts.save(temp_filename)
-
-            # Read the file back as bytes
-            with open(temp_filename, 'rb') as f:
-                audio_bytes = f.read()
-
-            # Clean up temporary file
-            os.unlink(temp_filename)
+            # gTTS does blocking HTTP requests, so synthesize in a worker thread
+            audio_bytes = await asyncio.to_thread(_synthesize, text)
 
             self.logger.info(f"Successfully generated TTS for: {text[:50]}...")
             return audio_bytes
@@ -4,9 +4,11 @@ from typing import Optional
 class BaseTTSProvider(ABC):
     """Base class for all TTS providers"""
 
+    MAX_CONCURRENCY = 1  # parallel requests allowed when a long text is synthesized in chunks
+
     @abstractmethod
-    async def generate_speech(self, text: str) -> Optional[bytes]:
-        """Generate speech from text"""
+    async def generate_speech(self, text: str, timeout: Optional[float] = None) -> Optional[bytes]:
+        """Generate speech from text, giving up on the provider call after `timeout` seconds"""
         pass
 
     @property
@@ -21,3 +23,7 @@ class BaseTTSProvider(ABC):
         """Get list of available voices"""
         pass
 
+    @property
+    def cache_id(self) -> str:
+        """Identify the provider, voice and model; cached speech is only reused for the same cache_id"""
+        return f"{self.name}:{getattr(self, '_voice', None) or ''}:{getattr(self, '_model', None) or ''}"
@@ -0,0 +1,84 @@
+import asyncio
+import os
+import threading
+import uuid
+from typing import Optional
+
+from app.logger import setup_logger
+
+class TTSCache:
+    """
+    Disk-backed LRU cache of synthesized speech.
+    Entries are files named by their cache key; a hit refreshes the file's mtime, and when the
+    total size exceeds `max_bytes` the least recently used files are removed until it is back
+    under 90% of the cap. All disk access runs in worker threads.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.logger = setup_logger()
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        entries = []
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+
+    def _put(self, key: str, data: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = os.path.join(os.path.dirname(path), f".{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self._size <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+                self._size -= size
+            except FileNotFoundError:
+                pass
+        self.logger.info(f"TTS cache evicted down to {self._size} bytes")
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def put(self, key: str, data: bytes):
+        try:
+            await asyncio.to_thread(self._put, key, data)
+        except OSError as e:
+            self.logger.error(f"Could not cache speech {key[:12]}: {e}")
@@ -0,0 +1,49 @@
+import re
+
+# Sentence ends, including the Greek question mark (U+037E), followed by whitespace
+_sentence_end = re.compile(r'(?<=[.!?;;…])\s+')
+_clause_end = re.compile(r'(?<=[,:])\s+')
+
+def split_text(text: str, max_chars: int) -> list[str]:
+    """Split text into chunks of at most `max_chars`, at sentence boundaries where possible"""
+    pieces = []
+    for sentence in _sentence_end.split(text.strip()):
+        if len(sentence) <= max_chars:
+            pieces.append(sentence)
+            continue
+        # Overlong sentence, fall back to clause and then word boundaries
+        for clause in _clause_end.split(sentence):
+            while len(clause) > max_chars:
+                cut = clause.rfind(' ', 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                pieces.append(clause[:cut])
+                clause = clause[cut:].lstrip()
+            if clause:
+                pieces.append(clause)
+
+    chunks, current = [], ""
+    for piece in pieces:
+        if current and len(current) + 1 + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current} {piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _strip_id3(data: bytes) -> bytes:
+    if data[:3] == b'ID3' and len(data) >= 10:
+        # ID3v2 header: size is a 28 bit syncsafe integer, plus a 10 byte footer if flagged
+        size = (data[6] & 0x7f) << 21 | (data[7] & 0x7f) << 14 | (data[8] & 0x7f) << 7 | (data[9] & 0x7f)
+        footer = 10 if data[5] & 0x10 else 0
+        data = data[10 + size + footer:]
+    if len(data) >= 128 and data[-128:-125] == b'TAG':
+        data = data[:-128]
+    return data
+
+def concat_mp3(parts: list[bytes]) -> bytes:
+    """Join MP3 streams frame by frame, without re-encoding, dropping their ID3 tags"""
+    if len(parts) == 1:
+        return parts[0]
+    return b"".join(_strip_id3(part) for part in parts)
@@ -8,6 +8,7 @@ from .base import BaseTTSProvider
 class GoogleTTSProvider(BaseTTSProvider):
     """Google Cloud TTS provider"""
 
+    MAX_CONCURRENCY = 2
     # Gemini audio output doesn't currently expose a stable set of voice names via the Python SDK
     AVAILABLE_VOICES = []
 
@@ -36,7 +37,11 @@ class GoogleTTSProvider(BaseTTSProvider):
     def voices(self) -> list[str]:
         return self.AVAILABLE_VOICES
 
-    async def generate_speech(self, text: str) -> Optional[bytes]:
+    @property
+    def cache_id(self) -> str:
+        return f"google:{self._voice or ''}:{self.model.model_name}"
+
+    async def generate_speech(self, text: str, timeout: Optional[float] = None) -> Optional[bytes]:
         """Generate speech using Gemini TTS (audio generation via Responses API)."""
         try:
             # Ask Gemini to convert text to audio
@@ -45,12 +50,12 @@ class GoogleTTSProvider(BaseTTSProvider):
                 "requestAudio": True,
                 "targetAudioMimeType": "audio/mpeg"
             }
-            response = self.model.generate_content(
+            response = await self.model.generate_content_async(
                 str(prompt),
                 generation_config=genai.types.GenerationConfig(
                     candidate_count=1
                 ),
-                stream=False
+                request_options={"timeout": timeout} if timeout else None
             )
 
             # Extract base64-encoded audio from candidates -> content -> parts -> inline_data.data
@@ -1,13 +1,20 @@
-import os
-import tempfile
+import asyncio
+import io
 from typing import Optional
 from gtts import gTTS
 from app.logger import setup_logger
 from .base import BaseTTSProvider
 
+def _synthesize(text: str, timeout: Optional[float] = None) -> bytes:
+    """Synthesize Greek speech with gTTS into an in-memory MP3"""
+    buffer = io.BytesIO()
+    gTTS(text=text, lang='el', slow=False, timeout=timeout).write_to_fp(buffer)
+    return buffer.getvalue()
+
 class GTTSProvider(BaseTTSProvider):
     """Google Translate TTS provider (gTTS)"""
 
+    MAX_CONCURRENCY = 2
     AVAILABLE_VOICES = ['el']  # Only Greek is supported
 
     def __init__(self):
@@ -22,23 +29,15 @@ class GTTSProvider(BaseTTSProvider):
     def voices(self) -> list[str]:
         return self.AVAILABLE_VOICES
 
-    async def generate_speech(self, text: str) -> Optional[bytes]:
+    @property
+    def cache_id(self) -> str:
+        return "gtts:el"
+
+    async def generate_speech(self, text: str, timeout: Optional[float] = None) -> Optional[bytes]:
         """Generate speech using gTTS"""
         try:
-            # Create gTTS object with Greek voice
-            tts = gTTS(text=text, lang='el', slow=False)
-
-            # Save to temporary file
-            with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as tmp_file:
-                temp_filename = tmp_file.name
-                tts.save(temp_filename)
-
-            # Read the file back as bytes
-            with open(temp_filename, 'rb') as f:
-                audio_bytes = f.read()
-
-            # Clean up temporary file
-            os.unlink(temp_filename)
+            # gTTS does blocking HTTP requests, so synthesize in a worker thread
+            audio_bytes = await asyncio.to_thread(_synthesize, text, timeout)
 
             self.logger.info(f"Successfully generated speech with gTTS: {text[:50]}...")
             return audio_bytes
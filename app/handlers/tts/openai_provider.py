@@ -1,12 +1,13 @@
 import os
 from typing import Optional
-from openai import OpenAI
+from openai import AsyncOpenAI
 from app.logger import setup_logger
 from .base import BaseTTSProvider
 
 class OpenAITTSProvider(BaseTTSProvider):
     """OpenAI TTS provider"""
 
+    MAX_CONCURRENCY = 4
     AVAILABLE_VOICES = ['alloy', 'echo', 'fable', 'onyx', 'nova', 'shimmer']
     AVAILABLE_MODELS = ['tts-1', 'tts-1-hd']
 
@@ -16,7 +17,7 @@ class OpenAITTSProvider(BaseTTSProvider):
         if not api_key:
             self.logger.error("OPENAI_API_KEY environment variable is not set")
             raise ValueError("OPENAI_API_KEY environment variable is not set")
-        self.client = OpenAI(api_key=api_key)
+        self.client = AsyncOpenAI(api_key=api_key)
         self._model = 'tts-1-hd'  # Higher quality model
         self._voice = 'nova'  # Default voice
         self.logger.info(f"OpenAI TTS provider initialized with {self._model} model and {self._voice} voice")
@@ -29,17 +30,18 @@ class OpenAITTSProvider(BaseTTSProvider):
     def voices(self) -> list[str]:
         return self.AVAILABLE_VOICES
 
-    async def generate_speech(self, text: str) -> Optional[bytes]:
+    async def generate_speech(self, text: str, timeout: Optional[float] = None) -> Optional[bytes]:
         """Generate speech using OpenAI's TTS API"""
         try:
-            response = self.client.audio.speech.create(
+            response = await self.client.audio.speech.create(
                 model=self._model,
                 voice=self._voice,
-                input=text
+                input=text,
+                timeout=timeout
             )
 
             # Get bytes from the response
-            audio_bytes = response.read()
+            audio_bytes = await response.aread()
 
             self.logger.info(f"Successfully generated speech with OpenAI TTS: {text[:50]}...")
             return audio_bytes
@@ -0,0 +1,18 @@
+import asyncio
+import os
+
+from ffmpeg.asyncio import FFmpeg
+
+# Telegram voice notes are Opus in OGG; speech stays clear well below music bitrates
+OPUS_BITRATE = os.getenv('TTS_OPUS_BITRATE', '24k')
+# Each transcode is an ffmpeg process, at most this many run at once
+TRANSCODE_WORKERS = int(os.getenv('TTS_TRANSCODE_WORKERS', str(os.cpu_count() or 2)))
+
+_workers = asyncio.Semaphore(TRANSCODE_WORKERS)
+
+async def to_opus(audio: bytes) -> bytes:
+    """Transcode provider audio (MP3) to a mono OGG/Opus voice note"""
+    ffmpeg = (FFmpeg().input("pipe:0")
+              .output("pipe:1", {"c:a": "libopus", "b:a": OPUS_BITRATE, "application": "voip", "ac": 1}, f="ogg"))
+    async with _workers:
+        return await ffmpeg.execute(audio)
@@ -1,6 +1,14 @@
-from typing import Optional
+import asyncio
+import hashlib
+import os
+import time
+from typing import AsyncIterator, Optional
+from app import metrics
 from app.logger import setup_logger
 from .base import BaseTTSProvider
+from .cache import TTSCache
+from .chunking import split_text, concat_mp3
+from .transcode import to_opus
 from .openai_provider import OpenAITTSProvider
 from .google_provider import GoogleTTSProvider
 
@@ -11,6 +19,14 @@ class TTSHandler:
         self.logger = setup_logger()
         self.providers: dict[str, BaseTTSProvider] = {}
         self._current_provider = None
+        self.cache = TTSCache(os.getenv('TTS_CACHE_DIR', 'files/tts'),
+                              int(os.getenv('TTS_CACHE_MAX_BYTES', str(100 * 1024 * 1024))))
+        # Longer texts are split at sentence boundaries and the chunks synthesized concurrently
+        self.chunk_chars = int(os.getenv('TTS_CHUNK_CHARS', '400'))
+        self.send_first_chunk = os.getenv('TTS_SEND_FIRST_CHUNK', 'off') == 'on'
+        self.limiters: dict[str, asyncio.Semaphore] = {}
+        # Provider MP3 is transcoded to Opus, the native format of Telegram voice notes
+        self.voice_format = os.getenv('TTS_VOICE_FORMAT', 'opus')
 
         # Try to initialize providers
         try:
@@ -58,12 +74,83 @@ class TTSHandler:
             return self.providers[provider].voices
         return []
 
-    async def generate_speech(self, text: str) -> Optional[bytes]:
-        """Generate speech using the current provider"""
+    def cache_key(self, text: str) -> Optional[str]:
+        """Key of the speech for `text` with the current provider, voice and model"""
         if not self._current_provider:
-            self.logger.error("No TTS provider available")
             return None
+        cache_id = self.providers[self._current_provider].cache_id
+        return hashlib.sha256(f"{cache_id}:{self.voice_format}\n{text}".encode()).hexdigest()
+
+    async def generate_speech(self, text: str, deadline=None) -> Optional[bytes]:
+        """Generate speech using the current provider, serving repeated texts from the cache"""
+        parts = [part async for part in self.generate_speech_parts(text, deadline, early=False)]
+        return parts[0] if parts else None
+
+    async def generate_speech_parts(self, text: str, deadline=None, early: bool = True) -> AsyncIterator[bytes]:
+        """
+        Yield the speech for `text`. With `early`, a text synthesized in several chunks is yielded
+        in two parts: the first chunk as soon as it is ready, then the rest. Yields nothing on failure.
+        """
+        if not self._current_provider:
+            self.logger.error("No TTS provider available")
+            return
+
+        key = self.cache_key(text)
+        audio = await self.cache.get(key)
+        if audio is not None:
+            metrics.increment('tts_cache.hit')
+            self.logger.debug(f"Using cached speech {key[:12]}")
+            yield audio
+            return
+        metrics.increment('tts_cache.miss')
 
         provider = self.providers[self._current_provider]
-        return await provider.generate_speech(text)
+        chunks = split_text(text, self.chunk_chars)
+        if len(chunks) > 1:
+            self.logger.info(f"Synthesizing {len(text)} characters in {len(chunks)} chunks with {provider.name}")
+        tasks = [asyncio.create_task(self._synthesize(provider, chunk, deadline)) for chunk in chunks]
+        try:
+            if early and len(tasks) > 1:
+                first = await tasks[0]
+                if first is None:
+                    return
+                yield (await self._encode(first))[0]
+                rest = await asyncio.gather(*tasks[1:])
+                if None in rest:
+                    return
+                yield (await self._encode(concat_mp3(rest)))[0]
+                audio, encoded = await self._encode(concat_mp3([first, *rest]))
+            else:
+                audios = await asyncio.gather(*tasks)
+                if None in audios:
+                    return
+                audio, encoded = await self._encode(concat_mp3(audios))
+                yield audio
+        finally:
+            for task in tasks:
+                task.cancel()
+        # Speech that could not be transcoded is sent as is, but not cached under the Opus key
+        if encoded:
+            await self.cache.put(key, audio)
+
+    async def _encode(self, mp3: bytes) -> tuple[bytes, bool]:
+        """Convert provider MP3 to the voice format; returns (audio, converted), the MP3 itself on failure"""
+        if self.voice_format != 'opus':
+            return mp3, True
+        start = time.perf_counter()
+        try:
+            audio = await to_opus(mp3)
+        except Exception as e:
+            metrics.increment('tts.transcode_failed')
+            self.logger.error(f"Could not transcode speech to Opus, sending MP3: {e}")
+            return mp3, False
+        metrics.observe('tts.transcode', time.perf_counter() - start)
+        self.logger.debug(f"Transcoded {len(mp3)} bytes of MP3 to {len(audio)} bytes of Opus")
+        return audio, True
 
+    async def _synthesize(self, provider: BaseTTSProvider, text: str, deadline=None) -> Optional[bytes]:
+        limiter = self.limiters.setdefault(provider.name, asyncio.Semaphore(provider.MAX_CONCURRENCY))
+        async with limiter:
+            if deadline is None:
+                return await provider.generate_speech(text)
+            return await deadline.run("tts", provider.generate_speech(text, timeout=deadline.remaining()))
@@ -24,23 +24,14 @@ def try_get_file(chat_id: int, message_id: int, categories=("photo", "voice")) -
             pass
     return None, ""
 
-def contains_laughter(text: str) -> bool:
-    """
-    Detect if a text message contains basic laughter expressions.
-    Returns True if laughter is detected, False otherwise.
-    """
-    laughter_patterns = [
-        # Basic patterns with repeating 'a'
-        r'[ax]a{2,}',  # xaa, axa, xaaa, etc.
-        r'[χα]α{2,}',  # χαα, αχα, χααα, etc.
-        r'[ah]a{2,}',  # haa, aha, haaa, etc.
-
-        # Alternating patterns
-        r'[ax][ax]+a',  # xaxa, axax, xaxxa, etc.
-        r'[χα][χα]+α',  # χαχα, αχαχ, χαχχα, etc.
-        r'[ah][ah]+a',  # haha, ahah, hahha, etc.
-    ]
-
-    combined_pattern = '|'.join(laughter_patterns)
-    return bool(re.search(combined_pattern, text.lower()))
-
+LAUGHTER = re.compile('|'.join([
+    # Basic patterns with repeating 'a'
+    r'[ax]a{2,}',  # xaa, axa, xaaa, etc.
+    r'[χα]α{2,}',  # χαα, αχα, χααα, etc.
+    r'[ah]a{2,}',  # haa, aha, haaa, etc.
+
+    # Alternating patterns
+    r'[ax][ax]+a',  # xaxa, axax, xaxxa, etc.
+    r'[χα][χα]+α',  # χαχα, αχαχ, χαχχα, etc.
+    r'[ah][ah]+a',  # haha, ahah, hahha, etc.
+]), re.IGNORECASE)
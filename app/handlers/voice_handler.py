@@ -1,56 +1,99 @@
 import os
-import base64
-import google.generativeai as genai
+import asyncio
+import hashlib
+import tempfile
+from typing import Optional
 from app.logger import setup_logger
+from app.deadline import TIMEOUT_REPLY
+from app.handlers.utils import store_file
+from app.handlers.voice_segments import detect_silences, plan_segments, cut_segment, stitch
+from app.handlers.stt import STTHandler
+from app import metrics
+
+TRANSCRIBE_FAILED = "Could not transcribe audio"
 
 class VoiceHandler:
-    def __init__(self):
-        """Initialize the voice handler with Gemini"""
+    # Shorter audio is sent as is; longer audio is split at silences and the segments transcribed concurrently
+    SPLIT_MIN_BYTES = int(os.getenv('VOICE_SPLIT_MIN_BYTES', str(256 * 1024)))
+    SEGMENT_CONCURRENCY = int(os.getenv('VOICE_SEGMENT_CONCURRENCY', '4'))
+
+    def __init__(self, db=None):
+        """Initialize the voice handler with the available STT providers, caching transcripts in `db` when given"""
         self.logger = setup_logger()
+        self.db = db
+        self.stt = STTHandler(db)
+        if not self.stt.providers:
+            self.logger.error("No STT provider available")
+            raise ValueError("No STT provider available")
 
-        # Configure Gemini API
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key:
-            self.logger.error("GEMINI_API_KEY environment variable is not set")
-            raise ValueError("GEMINI_API_KEY environment variable is not set")
+    async def transcribe_voice(self, voice_bytes: bytes, deadline=None, chat_id: int = None) -> str:
+        """
+        Transcribe a voice message with the best available STT provider for the chat.
+        Transcripts are cached by audio hash, so the same voice note is only transcribed once.
+        """
+        audio_hash = None
+        if self.db is not None:
+            audio_hash = await asyncio.to_thread(lambda: hashlib.sha256(voice_bytes).hexdigest())
+            # Cached transcripts are only reused for the models and prompts currently configured
+            transcript = self.db.get_transcript(audio_hash, self.stt.model_ids())
+            if transcript is not None:
+                metrics.increment('transcripts.hit')
+                self.logger.debug(f"Using cached transcript for audio {audio_hash[:12]}")
+                return transcript
+            metrics.increment('transcripts.miss')
 
-        genai.configure(api_key=api_key)
+        if deadline is None:
+            transcript, model_id = await self._transcribe_audio(voice_bytes, chat_id=chat_id)
+        else:
+            transcript, model_id = await deadline.run("voice", self._transcribe_audio(voice_bytes, deadline.remaining(), chat_id),
+                                                      (TIMEOUT_REPLY, None))
 
-        # Use Gemini 1.5 Flash for audio transcription
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
-        self.logger.info("Voice handler initialized with Gemini 2.5 Flash")
+        if audio_hash and model_id and transcript:
+            self.db.store_transcript(audio_hash, model_id, transcript)
+        return transcript
 
-    async def transcribe_voice(self, voice_bytes: bytes) -> str:
-        """
-        Transcribe a voice message using Gemini's multimodal capabilities
-        """
-        try:
-            # Convert audio bytes to base64
-            audio_base64 = base64.b64encode(voice_bytes).decode('utf-8')
-
-            # Create the prompt for transcription
-            prompt = """Please transcribe the following audio.
-            The audio contains Greek speech with some English technical terms.
-            Please preserve any English words exactly as spoken and transcribe the Greek text properly.
-            Return ONLY the transcription, no additional text or explanation."""
-
-            # Prepare the content with audio data
-            response = self.model.generate_content([
-                prompt,
-                {
-                    "mime_type": "audio/ogg",
-                    "data": audio_base64
-                }
-            ])
-
-            # Get the transcription
-            transcript = response.text.strip()
-
-            self.logger.info(f"Successfully transcribed voice message using Gemini: {transcript[:100]}...")
-            return transcript
-
-        except Exception as e:
-            self.logger.error(f"Error transcribing voice message with Gemini: {str(e)}")
-            # Fallback to empty string if transcription fails
-            return "Could not transcribe audio"
+    async def _transcribe_audio(self, voice_bytes: bytes, timeout: float = None, chat_id: int = None) -> tuple[str, Optional[str]]:
+        """Transcribe short audio in one request, long audio in segments split at silences. Returns (transcript, model_id)"""
+        if len(voice_bytes) < self.SPLIT_MIN_BYTES:
+            return await self._transcribe(voice_bytes, timeout, chat_id)
+        # ffmpeg needs a seekable input to cut segments, stdin is not
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'audio.ogg')
+            await asyncio.to_thread(store_file, path, voice_bytes)
+            try:
+                duration, silences = await detect_silences(path)
+            except Exception as e:
+                self.logger.warning(f"Could not detect silences, transcribing in one request: {e}")
+                return await self._transcribe(voice_bytes, timeout, chat_id)
+            segments = plan_segments(duration, silences)
+            if len(segments) == 1:
+                return await self._transcribe(voice_bytes, timeout, chat_id)
+            self.logger.info(f"Transcribing {duration:.0f}s of audio in {len(segments)} segments")
+            metrics.increment('voice.segments', len(segments))
+
+            semaphore = asyncio.Semaphore(self.SEGMENT_CONCURRENCY)
+
+            async def transcribe_segment(start: float, end: float) -> tuple[str, Optional[str]]:
+                async with semaphore:
+                    segment = await cut_segment(path, start, end)
+                    result = await self._transcribe(segment, timeout, chat_id)
+                    if result[1] is None:
+                        self.logger.info(f"Retrying segment {start:.1f}-{end:.1f}s")
+                        result = await self._transcribe(segment, timeout, chat_id)
+                    return result
+
+            try:
+                results = await asyncio.gather(*(transcribe_segment(start, end) for start, end in segments))
+            except Exception as e:
+                self.logger.warning(f"Could not split audio, transcribing in one request: {e}")
+                return await self._transcribe(voice_bytes, timeout, chat_id)
+        if any(model_id is None for _, model_id in results):
+            return TRANSCRIBE_FAILED, None
+        # Segments may have been routed to different providers, the first one stands for the whole
+        return stitch([transcript for transcript, _ in results], segments), results[0][1]
 
+    async def _transcribe(self, voice_bytes: bytes, timeout: float = None, chat_id: int = None) -> tuple[str, Optional[str]]:
+        transcript, model_id = await self.stt.transcribe(voice_bytes, chat_id, timeout)
+        if transcript is None:
+            return TRANSCRIBE_FAILED, None
+        return transcript, model_id
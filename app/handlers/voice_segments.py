@@ -0,0 +1,75 @@
+import os
+import re
+
+from ffmpeg.asyncio import FFmpeg
+
+# Target segment length; cuts are placed at the silence closest to it, never past the maximum
+SEGMENT_SECONDS = float(os.getenv('VOICE_SEGMENT_SECONDS', '60'))
+MAX_SEGMENT_SECONDS = SEGMENT_SECONDS * 1.5
+# Hard cuts (no silence found) overlap by this much so no word is lost at the boundary
+OVERLAP_SECONDS = 2.0
+
+_silence_start = re.compile(r'silence_start: (-?[\d.]+)')
+_silence_end = re.compile(r'silence_end: ([\d.]+)')
+_time = re.compile(r'time=(\d+):(\d+):([\d.]+)')
+_word = re.compile(r'\w+')
+
+async def detect_silences(path: str, noise: str = '-30dB', min_silence: float = 0.4) -> tuple[float, list[tuple[float, float]]]:
+    """Run ffmpeg silencedetect over an audio file and return (duration, [(silence_start, silence_end)])"""
+    silences, duration, start = [], 0.0, None
+
+    ffmpeg = (FFmpeg().input(path)
+              .output("-", {"af": f"silencedetect=noise={noise}:d={min_silence}"}, f="null"))
+
+    @ffmpeg.on("stderr")
+    def on_stderr(line: str):
+        nonlocal start, duration
+        if match := _silence_start.search(line):
+            start = max(0.0, float(match.group(1)))
+        elif (match := _silence_end.search(line)) and start is not None:
+            silences.append((start, float(match.group(1))))
+            start = None
+        if match := _time.search(line):
+            hours, minutes, seconds = match.groups()
+            duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    await ffmpeg.execute()
+    return duration, silences
+
+def plan_segments(duration: float, silences: list[tuple[float, float]],
+                  target: float = SEGMENT_SECONDS, maximum: float = MAX_SEGMENT_SECONDS) -> list[tuple[float, float]]:
+    """Split [0, duration] into (start, end) segments of about `target` seconds, cutting in the middle of silences"""
+    cuts = [(silence_start + silence_end) / 2 for silence_start, silence_end in silences]
+    segments, start = [], 0.0
+    while duration - start > maximum:
+        candidates = [cut for cut in cuts if start + target / 2 <= cut <= start + maximum]
+        if candidates:
+            cut = min(candidates, key=lambda c: abs(c - start - target))
+            segments.append((start, cut))
+            start = cut
+        else:
+            segments.append((start, start + target))
+            start = start + target - OVERLAP_SECONDS
+    segments.append((start, duration))
+    return segments
+
+async def cut_segment(path: str, start: float, end: float) -> bytes:
+    """Re-encode one segment of an audio file as OGG/Opus"""
+    return await (FFmpeg().input(path, ss=f"{start:.2f}", t=f"{end - start:.2f}")
+                  .output("pipe:1", {"c:a": "libopus", "b:a": "32k", "application": "voip"}, f="ogg")
+                  .execute())
+
+def stitch(transcripts: list[str], segments: list[tuple[float, float]], max_overlap_words: int = 12) -> str:
+    """Join segment transcripts in order, dropping words repeated across overlapping segment boundaries"""
+    result = []
+    for i, transcript in enumerate(transcripts):
+        words = transcript.split()
+        if result and segments[i][0] < segments[i - 1][1]:
+            tail = [w.lower() for w in _word.findall(" ".join(result[-max_overlap_words:]))]
+            for size in range(min(max_overlap_words, len(words), len(tail)), 0, -1):
+                head = [w.lower() for w in _word.findall(" ".join(words[:size]))]
+                if head and tail[-len(head):] == head:
+                    words = words[size:]
+                    break
+        result.extend(words)
+    return " ".join(result)
@@ -0,0 +1,31 @@
+import threading
+from collections import Counter
+
+_lock = threading.Lock()
+_counters = Counter()
+_timings = {}
+
+def increment(name: str, value: int = 1):
+    """Increment a named counter"""
+    with _lock:
+        _counters[name] += value
+
+def observe(name: str, seconds: float):
+    """Record a duration (in seconds) for a named timing"""
+    with _lock:
+        count, total, worst = _timings.get(name, (0, 0.0, 0.0))
+        _timings[name] = (count + 1, total + seconds, max(worst, seconds))
+
+def get(name: str) -> int:
+    """Get the current value of a counter"""
+    with _lock:
+        return _counters[name]
+
+def snapshot() -> dict:
+    """Return a copy of all counters and timing summaries"""
+    with _lock:
+        timings = {
+            name: {'count': count, 'avg': total / count, 'max': worst}
+            for name, (count, total, worst) in _timings.items()
+        }
+        return {'counters': dict(_counters), 'timings': timings}
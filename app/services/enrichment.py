@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+import itertools
+import os
+import time
+
+from app import metrics
+from app.brain import ERROR_PREFIXES
+from app.deadline import Deadline, TIMEOUT_REPLY
+from app.logger import setup_logger
+
+DESCRIBE_PROMPT = "Explain this image"
+enrichmentKey = 'enrichment'
+
+# Voice notes are cheaper and more often asked about than photos, so they go first
+PRIORITIES = {'voice': 0, 'photo': 1}
+
+class MediaEnricher:
+    """
+    Opt-in background pipeline that transcribes voice notes and describes photos as
+    soon as they arrive, so a later 👾 reaction or reply is answered from the cache.
+
+    Jobs go into a bounded priority queue served by a small worker pool. Workers are
+    spaced to stay under ENRICH_MAX_PER_MINUTE backend calls, and work is shed instead
+    of piling up: new jobs are dropped when the queue is full, and queued jobs older
+    than ENRICH_MAX_AGE_SECONDS are skipped. Both are counted in the metrics.
+    """
+
+    def __init__(self, bot):
+        self.logger = setup_logger()
+        self.db = bot.db
+        self.media = bot.media
+        self.voice = bot.voice
+        self.get_brain = bot.get_brain
+        self.workers = int(os.getenv('ENRICH_WORKERS', '2'))
+        self.max_age = float(os.getenv('ENRICH_MAX_AGE_SECONDS', '600'))
+        # Budget of a single job, so a hung backend call cannot hold a worker forever
+        self.job_seconds = float(os.getenv('ENRICH_JOB_SECONDS', '120'))
+        per_minute = float(os.getenv('ENRICH_MAX_PER_MINUTE', '20'))
+        self.min_interval = 60 / per_minute if per_minute > 0 else 0
+        self.queue = asyncio.PriorityQueue(maxsize=int(os.getenv('ENRICH_QUEUE_SIZE', '50')))
+        self._sequence = itertools.count()
+        self._next_slot = 0.0
+        self._throttle_lock = asyncio.Lock()
+        self._tasks = []
+
+    def is_enabled(self, chat_id: int) -> bool:
+        return self.db.get_setting(chat_id, enrichmentKey, "off") == "on"
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self.logger.info(f"Media enrichment started with {self.workers} workers, "
+                         f"at most one job every {self.min_interval:.1f}s")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, category: str, chat_id: int, message_id: int, telegram_bot):
+        """Queue a received photo or voice note for enrichment if the chat opted in"""
+        if category not in PRIORITIES or not self.is_enabled(chat_id):
+            return
+        job = (PRIORITIES[category], next(self._sequence), category, chat_id, message_id, telegram_bot, time.monotonic())
+        try:
+            self.queue.put_nowait(job)
+            metrics.increment('enrichment.queued')
+        except asyncio.QueueFull:
+            metrics.increment('enrichment.shed')
+            self.logger.warning(f"Enrichment queue full, dropping {category} {chat_id}/{message_id}")
+
+    async def _worker(self, number: int):
+        while True:
+            _, _, category, chat_id, message_id, telegram_bot, queued_at = await self.queue.get()
+            try:
+                if time.monotonic() - queued_at > self.max_age:
+                    metrics.increment('enrichment.expired')
+                    continue
+                await self._throttle()
+                start = time.perf_counter()
+                await self.enrich(category, chat_id, message_id, telegram_bot)
+                metrics.observe(f"enrichment.{category}", time.perf_counter() - start)
+            except Exception as e:
+                metrics.increment('enrichment.failed')
+                self.logger.error(f"Enrichment worker {number} failed on {category} {chat_id}/{message_id}: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _throttle(self):
+        """Space job starts evenly across all workers"""
+        async with self._throttle_lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.min_interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def enrich(self, category: str, chat_id: int, message_id: int, telegram_bot):
+        media = self.db.get_media(chat_id, message_id)
+        if not media:
+            return
+        deadline = Deadline(self.job_seconds)
+        data = await deadline.run("enrichment.download", self.media.read(telegram_bot, media))
+        if not data:
+            return
+        if category == 'voice':
+            await self.voice.transcribe_voice(data, deadline=deadline, chat_id=chat_id)
+        else:
+            # Refresh the record, reading may have downloaded the photo and filled in its hash
+            media = self.db.get_media(chat_id, message_id)
+            await self.describe_photo(self.get_brain(chat_id), data, self.system_prompt(chat_id), self.media.content_key(media), deadline=deadline)
+        self.logger.info(f"Enriched {category} {chat_id}/{message_id}")
+
+    def system_prompt(self, chat_id: int) -> str:
+        context_setting = self.db.get_setting(chat_id, "context", "")
+        contexts = context_setting.split("\n") if context_setting else []
+        return "\n".join([f"System: {ctx}" for ctx in contexts]) + "\n" if contexts else ""
+
+    async def describe_photo(self, brain, image, system_prompt: str = "", media_hash: str = None, deadline=None) -> str:
+        """Describe a photo, reusing a cached description of the same image, model and chat context"""
+        cache_key = None
+        if media_hash:
+            model = getattr(brain, 'current_model', getattr(brain, 'model_name', ''))
+            cache_key = hashlib.sha256(f"{type(brain).__name__}/{model}\n{DESCRIBE_PROMPT}\n{system_prompt}\n{media_hash}".encode()).hexdigest()
+            description = self.db.get_description(cache_key)
+            if description is not None:
+                metrics.increment('descriptions.hit')
+                return description
+            metrics.increment('descriptions.miss')
+
+        request = brain.process_image(image, DESCRIBE_PROMPT, system_prompt, deadline=deadline)
+        description = await (deadline.run("vision", request, TIMEOUT_REPLY) if deadline else request)
+        if cache_key and description and description != TIMEOUT_REPLY and not description.startswith(ERROR_PREFIXES):
+            self.db.store_description(cache_key, description)
+        return description
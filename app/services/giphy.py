@@ -1,14 +1,23 @@
+import asyncio
 import os
 import random
-import aiohttp
+from collections import deque
 from typing import Optional
 
+from app import metrics
+from app.services.http import HTTPSessionManager
+
 class GiphyService:
-    def __init__(self):
+    def __init__(self, http: Optional[HTTPSessionManager] = None):
         self.api_key = os.getenv('GIPHY_API_KEY')
         if not self.api_key:
             raise ValueError("GIPHY_API_KEY environment variable is required")
         self.base_url = "https://api.giphy.com/v1/gifs"
+        self.http = http or HTTPSessionManager()
+        # GIF URLs fetched ahead of time per tag, so a send does not wait for Giphy
+        self.pool_size = int(os.getenv('GIPHY_POOL_SIZE', '5'))
+        self.pools: dict[str, deque] = {}
+        self._refills: dict[str, asyncio.Task] = {}
 
     async def get_random_gif(self, tag: str) -> Optional[str]:
         """Fetch a random laughter gif from Giphy"""
@@ -21,12 +30,42 @@ class GiphyService:
         }
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.base_url}/random", params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data['data']['images']['original']['url']
+            status, data = await self.http.request('giphy', 'GET', f"{self.base_url}/random", params=params)
+            if status == 200:
+                return data['data']['images']['original']['url']
         except Exception as e:
             print(f"Error fetching Giphy gif: {e}")
             return None
 
+    def warm(self, tag: str):
+        """Start filling the pool of a tag in the background"""
+        task = self._refills.get(tag)
+        if task is None or task.done():
+            self._refills[tag] = asyncio.create_task(self._refill(tag))
+
+    async def next_gif(self, tag: str) -> Optional[str]:
+        """Take a GIF URL from the tag's pool, refilling it in the background; fetch live if it is empty"""
+        pool = self.pools.setdefault(tag, deque())
+        url = pool.popleft() if pool else None
+        self.warm(tag)
+        if url:
+            metrics.increment('giphy_pool.hit')
+            return url
+        metrics.increment('giphy_pool.miss')
+        return await self.get_random_gif(tag)
+
+    async def _refill(self, tag: str):
+        pool = self.pools.setdefault(tag, deque())
+        failures = 0
+        while len(pool) < self.pool_size and failures < 3:
+            url = await self.get_random_gif(tag)
+            if url and url not in pool:
+                pool.append(url)
+            else:
+                failures += 1
+
+    async def close(self):
+        for task in self._refills.values():
+            task.cancel()
+        await asyncio.gather(*self._refills.values(), return_exceptions=True)
+        self._refills = {}
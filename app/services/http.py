@@ -0,0 +1,78 @@
+import asyncio
+import os
+from typing import Any, Tuple
+
+import aiohttp
+
+from app.logger import setup_logger
+
+# Per-service defaults: connections per host, total request timeout in seconds (0 = none, for
+# streamed downloads) and retries of failed requests. Override with HTTP_<SERVICE>_LIMIT,
+# HTTP_<SERVICE>_TIMEOUT and HTTP_<SERVICE>_RETRIES.
+POLICIES = {
+    'translate': {'limit': 10, 'timeout': 15, 'retries': 2},
+    'giphy': {'limit': 4, 'timeout': 10, 'retries': 1},
+    'media': {'limit': 8, 'timeout': 0, 'retries': 0},
+}
+DEFAULT_POLICY = {'limit': 4, 'timeout': 30, 'retries': 0}
+
+# Transient answers worth another try
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class HTTPSessionManager:
+    """
+    Application-scoped aiohttp sessions, one per outbound service.
+
+    Each service gets its own connector, so a slow or flooded service cannot use up the
+    connections of another, with keep-alive connections and a DNS cache shared by all its
+    requests. Sessions are created on first use and closed when the application shuts down.
+    """
+
+    def __init__(self):
+        self.logger = setup_logger()
+        self._sessions: dict[str, aiohttp.ClientSession] = {}
+
+    def policy(self, service: str) -> dict:
+        policy = dict(POLICIES.get(service, DEFAULT_POLICY))
+        for key in policy:
+            value = os.getenv(f"HTTP_{service.upper()}_{key.upper()}")
+            if value:
+                policy[key] = type(policy[key])(value)
+        return policy
+
+    def session(self, service: str) -> aiohttp.ClientSession:
+        session = self._sessions.get(service)
+        if session is None or session.closed:
+            policy = self.policy(service)
+            connector = aiohttp.TCPConnector(limit_per_host=policy['limit'], ttl_dns_cache=300, keepalive_timeout=30)
+            timeout = aiohttp.ClientTimeout(total=policy['timeout'] or None, sock_connect=10, sock_read=60)
+            session = self._sessions[service] = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return session
+
+    async def request(self, service: str, method: str, url: str, **kwargs) -> Tuple[int, Any]:
+        """
+        Make a request and return (status, body), the body parsed as JSON when it is JSON.
+        Connection errors, timeouts and transient statuses are retried with exponential backoff
+        as many times as the service's policy allows; the last failure is raised or returned.
+        """
+        retries = self.policy(service)['retries']
+        for attempt in range(retries + 1):
+            try:
+                async with self.session(service).request(method, url, **kwargs) as response:
+                    if response.content_type == 'application/json':
+                        body = await response.json()
+                    else:
+                        body = await response.text()
+                    if response.status not in RETRY_STATUSES or attempt == retries:
+                        return response.status, body
+                    self.logger.warning(f"{service} answered {response.status}, retrying")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == retries:
+                    raise
+                self.logger.warning(f"{service} request failed ({e!r}), retrying")
+            await asyncio.sleep(0.2 * 2 ** attempt)
+
+    async def close(self):
+        for session in self._sessions.values():
+            await session.close()
+        self._sessions = {}
@@ -0,0 +1,130 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+from ffmpeg.asyncio import FFmpeg
+
+from app.brain.image_preprocessing import preprocess_image_sync
+from app.logger import setup_logger
+
+def _env_int(key: str, default: int = 0) -> int:
+    return int(os.getenv(key, str(default)))
+
+class MediaStorageManager:
+    """
+    Keeps the media store within configurable quotas.
+
+    Usage is read from the `media` table, so no directory walks are needed. Each
+    cycle evicts at most `batch_size` least recently used files, then optionally
+    recompresses a batch of old photos and voice notes. Evicted media keeps its
+    Telegram file_id, so it can still be downloaded again on demand.
+    A quota of 0 means unlimited.
+    """
+
+    def __init__(self, db, media_store):
+        self.logger = setup_logger()
+        self.db = db
+        self.media = media_store
+        self.total_quota = _env_int('MEDIA_QUOTA_BYTES')
+        self.category_quotas = {
+            'photo': _env_int('MEDIA_QUOTA_PHOTO_BYTES'),
+            'voice': _env_int('MEDIA_QUOTA_VOICE_BYTES'),
+        }
+        self.chat_quota = _env_int('MEDIA_CHAT_QUOTA_BYTES')
+        self.recompress_after_days = _env_int('MEDIA_RECOMPRESS_AFTER_DAYS')
+        self.interval = _env_int('MEDIA_GC_INTERVAL_SECONDS', 300)
+        self.batch_size = _env_int('MEDIA_GC_BATCH_SIZE', 100)
+        self._task = None
+
+    def start(self):
+        if not (self.total_quota or any(self.category_quotas.values()) or self.chat_quota or self.recompress_after_days):
+            self.logger.info("Media storage manager disabled, no quotas or recompression configured")
+            return
+        self._task = asyncio.create_task(self._run())
+        self.logger.info(f"Media storage manager started (total quota {self.total_quota}, per category "
+                         f"{self.category_quotas}, per chat {self.chat_quota}, recompress after "
+                         f"{self.recompress_after_days} days, every {self.interval}s)")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.logger.error(f"Media storage maintenance failed: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self):
+        usage = self.db.get_media_usage()
+        self.logger.info(f"Media usage: {usage['total']} bytes, per category {usage['categories']}")
+        budget = self.batch_size
+
+        if self.total_quota and usage['total'] > self.total_quota:
+            budget -= await self._evict(usage['total'] - self.total_quota, budget)
+        for category, quota in self.category_quotas.items():
+            used = usage['categories'].get(category, 0)
+            if quota and used > quota and budget > 0:
+                budget -= await self._evict(used - quota, budget, category=category)
+        if self.chat_quota:
+            for chat_id, used in usage['chats'].items():
+                if used > self.chat_quota and budget > 0:
+                    budget -= await self._evict(used - self.chat_quota, budget, chat_id=chat_id, per_chat=True)
+
+        if self.recompress_after_days:
+            await self._recompress(datetime.now() - timedelta(days=self.recompress_after_days))
+
+    async def _evict(self, excess: int, limit: int, category: str = None, chat_id: int = None, per_chat: bool = False) -> int:
+        """
+        Unlink least recently used media until `excess` bytes are freed or `limit` records are processed.
+        Disk bytes are only freed when no other message references the object, but a chat's own
+        usage drops as soon as its reference is gone. Returns the number of records processed.
+        """
+        freed, processed = 0, 0
+        for media in self.db.get_lru_media(limit, category=category, chat_id=chat_id):
+            if freed >= excess:
+                break
+            processed += 1
+            orphaned = self.db.unlink_media(media['chat_id'], media['message_id'])
+            if orphaned:
+                await asyncio.to_thread(self.media.delete_object, media['hash'])
+            if orphaned or per_chat:
+                freed += media['size']
+        self.logger.info(f"Evicted {processed} media records ({freed} bytes) "
+                         f"for quota of {category or (f'chat {chat_id}' if chat_id else 'all media')}")
+        return processed
+
+    async def _recompress(self, older_than: datetime):
+        for media in self.db.get_media_to_recompress(older_than, self.batch_size):
+            path = self.media.object_path(media['hash'])
+            try:
+                if media['category'] == 'photo':
+                    data = await asyncio.to_thread(self.media.open_object, path)
+                    smaller = await asyncio.to_thread(preprocess_image_sync, data, 1280, 'JPEG', 70)
+                    mime = 'image/jpeg'
+                elif media['category'] == 'voice':
+                    smaller = await (FFmpeg().option("y").input(path)
+                                     .output("pipe:1", {"c:a": "libopus", "b:a": "16k", "application": "voip"}, f="ogg")
+                                     .execute())
+                    mime = 'audio/ogg'
+                else:
+                    continue
+            except Exception as e:
+                self.logger.error(f"Failed to recompress {media['category']} {media['hash'][:12]}: {e}")
+                smaller = None
+
+            if not smaller or len(smaller) >= media['size']:
+                # Keep the original, but do not try again
+                self.db.replace_media_hash(media['hash'], media['hash'], media['size'], media['mime'])
+                continue
+            digest = await asyncio.to_thread(self.media.write_object, smaller)
+            self.db.replace_media_hash(media['hash'], digest, len(smaller), mime)
+            await asyncio.to_thread(self.media.delete_object, media['hash'])
+            self.logger.info(f"Recompressed {media['category']} {media['hash'][:12]}: {media['size']} -> {len(smaller)} bytes")
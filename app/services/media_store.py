@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+import mmap
+import os
+import shutil
+import uuid
+from typing import Optional, Tuple
+
+from app.handlers.utils import store_file, try_get_file
+from app.logger import setup_logger
+from app.services.http import HTTPSessionManager
+
+CHUNK_SIZE = 256 * 1024
+
+class MediaStore:
+    """
+    Content-addressed storage for photos and voice notes.
+    Each distinct file is written once under its sha256; the `media` table maps
+    (chat_id, message_id) to the hash together with category, size, mime type and
+    the Telegram file ids.
+
+    Downloads are streamed to a temporary file in chunks and renamed into place, and
+    stored files are handed out as read-only memory maps opened in a worker thread,
+    so whole files never sit in memory and disk I/O stays off the event loop.
+
+    In lazy mode only the Telegram metadata is recorded when media arrives, and the
+    bytes are downloaded by file_id the first time something needs them. Downloaded
+    objects stay on disk and serve as the local cache for later requests.
+    """
+
+    def __init__(self, db, root: str = 'files', lazy: bool = False, http: Optional[HTTPSessionManager] = None):
+        self.logger = setup_logger()
+        self.db = db
+        self.root = root
+        self.lazy = lazy
+        # Without a shared manager the store owns its sessions and closes them itself
+        self._owns_http = http is None
+        self.http = http or HTTPSessionManager()
+        self.logger.info(f"Media store initialized at {root} ({'lazy' if lazy else 'eager'} download)")
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.root, 'objects', digest[:2], digest)
+
+    def write_object(self, data: bytes) -> str:
+        """Write bytes under their content hash, unless already present, and return the hash"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        if os.path.exists(path):
+            self.logger.debug(f"Media {digest[:12]} already stored")
+        else:
+            # Write under a temporary name so readers never see a partial object
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            store_file(tmp_path, data)
+            os.replace(tmp_path, path)
+        return digest
+
+    @staticmethod
+    def content_key(media: dict) -> str:
+        """Hash identifying a media record's content, which stays the same when the object is recompressed"""
+        return media['original_hash'] or media['hash']
+
+    def delete_object(self, digest: str):
+        try:
+            os.remove(self.object_path(digest))
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def open_object(path: str):
+        """Map a stored file read-only; the map supports the buffer protocol as well as read/seek"""
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    async def receive(self, category: str, chat_id: int, message_id: int, attachment, bot, mime: str = None) -> Optional[str]:
+        """
+        Register an incoming Telegram attachment (PhotoSize, Voice, ...) for a message.
+        Returns the content hash, or None when the download was deferred.
+        """
+        known = self.db.get_media_by_unique_id(attachment.file_unique_id)
+        if known and os.path.exists(self.object_path(known['hash'])):
+            # Forwarded or re-sent file we already have, no need to download it again
+            self.db.store_media(chat_id, message_id, known['hash'], category, known['size'], mime,
+                                attachment.file_id, attachment.file_unique_id, known['original_hash'])
+            return known['hash']
+
+        if self.lazy:
+            self.db.store_media(chat_id, message_id, None, category, attachment.file_size or 0, mime,
+                                attachment.file_id, attachment.file_unique_id)
+            self.logger.debug(f"Deferred download of {category} {chat_id}/{message_id}")
+            return None
+
+        digest, size = await self.download(bot, attachment.file_id)
+        self.db.store_media(chat_id, message_id, digest, category, size, mime, attachment.file_id, attachment.file_unique_id)
+        return digest
+
+    async def download(self, bot, file_id: str) -> Tuple[str, int]:
+        """Stream a Telegram file into the store and return its (hash, size)"""
+        telegram_file = await bot.get_file(file_id)
+        tmp_dir = os.path.join(self.root, 'tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+        try:
+            if telegram_file.file_path.startswith(('http://', 'https://')):
+                digest, size = await self._stream_to_file(telegram_file.file_path, tmp_path)
+            else:
+                # Local Bot API server, the file is already on this machine
+                await asyncio.to_thread(shutil.copyfile, telegram_file.file_path, tmp_path)
+                digest, size = await asyncio.to_thread(self._hash_file, tmp_path)
+            await asyncio.to_thread(self._commit, tmp_path, digest)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return digest, size
+
+    async def _stream_to_file(self, url: str, tmp_path: str) -> Tuple[str, int]:
+        # python-telegram-bot's download helpers buffer the whole file, so fetch the file URL directly
+        sha, size = hashlib.sha256(), 0
+        f = await asyncio.to_thread(open, tmp_path, 'wb')
+        try:
+            async with self.http.session('media').get(url) as resp:
+                resp.raise_for_status()
+                async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                    sha.update(chunk)
+                    size += len(chunk)
+                    await asyncio.to_thread(f.write, chunk)
+        finally:
+            await asyncio.to_thread(f.close)
+        return sha.hexdigest(), size
+
+    @staticmethod
+    def _hash_file(path: str) -> Tuple[str, int]:
+        sha, size = hashlib.sha256(), 0
+        with open(path, 'rb') as f:
+            while chunk := f.read(CHUNK_SIZE):
+                sha.update(chunk)
+                size += len(chunk)
+        return sha.hexdigest(), size
+
+    def _commit(self, tmp_path: str, digest: str):
+        path = self.object_path(digest)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+
+    async def fetch(self, bot, chat_id: int, message_id: int) -> Tuple[Optional[bytes], str]:
+        """Return (buffer, category) of a message's media, downloading deferred media by file_id"""
+        media = self.db.get_media(chat_id, message_id)
+        if not media:
+            return await self.load_legacy(chat_id, message_id)
+        return await self.read(bot, media), media['category']
+
+    async def read(self, bot, media: dict) -> Optional[bytes]:
+        """Map the bytes of a media record returned by `db.get_media`, downloading them if needed"""
+        if media['hash'] and os.path.exists(self.object_path(media['hash'])):
+            self.db.touch_media(media['chat_id'], media['message_id'])
+            return await asyncio.to_thread(self.open_object, self.object_path(media['hash']))
+        if not media['file_id']:
+            self.logger.warning(f"Media {media['chat_id']}/{media['message_id']} is not stored and has no file_id")
+            return None
+        self.logger.info(f"Downloading {media['category']} {media['chat_id']}/{media['message_id']} on demand")
+        digest, size = await self.download(bot, media['file_id'])
+        self.db.store_media(media['chat_id'], media['message_id'], digest, media['category'], size, media['mime'],
+                            media['file_id'], media['file_unique_id'])
+        return await asyncio.to_thread(self.open_object, self.object_path(digest))
+
+    async def load_legacy(self, chat_id: int, message_id: int) -> Tuple[Optional[bytes], str]:
+        """Media stored before the content-addressed store, under files/{category}/{chat_id}/{message_id}"""
+        return await asyncio.to_thread(try_get_file, chat_id, message_id)
+
+    async def close(self):
+        if self._owns_http:
+            await self.http.close()
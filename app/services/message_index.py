@@ -0,0 +1,194 @@
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from app.logger import setup_logger
+
+class HashedNgramEncoder:
+    """Embed text as L2-normalised signed counts of hashed words and character n-grams"""
+
+    def __init__(self, dim: int = 512, ngram_sizes=(3, 4)):
+        self.dim = dim
+        self.ngram_sizes = ngram_sizes
+
+    def features(self, text: str) -> list[str]:
+        text = re.sub(r'\s+', ' ', text.lower()).strip()
+        words = re.findall(r'\w+', text)
+        features = [f"w:{word}" for word in words]
+        for word in words:
+            padded = f" {word} "
+            for n in self.ngram_sizes:
+                features.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        return features
+
+    def encode(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        features = self.features(text)
+        if not features:
+            return vector
+        # crc32 is stable across processes, unlike hash()
+        hashes = np.fromiter((zlib.crc32(f.encode()) for f in features), dtype=np.uint32, count=len(features))
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        np.add.at(vector, hashes % self.dim, signs)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+class ChatIndex:
+    """
+    Ring buffer of message vectors for one chat, stored as .npy memmaps.
+    The arrays start small and double as messages come in, up to `capacity` rows, after which
+    the oldest rows are overwritten.
+    """
+
+    FLUSH_EVERY = 32
+    INITIAL_ROWS = 64
+
+    def __init__(self, path: str, dim: int, capacity: int):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.capacity = capacity
+        # meta[0] is the next slot to write, meta[1] the number of filled slots
+        self.meta = self._open(os.path.join(path, 'meta.npy'), np.int64, (2,), 0)
+        self.vectors = self._load(os.path.join(path, 'vectors.npy'), np.float32, (dim,))
+        self.ids = self._load(os.path.join(path, 'ids.npy'), np.int64, ())
+        if self.vectors is None or self.ids is None or len(self.vectors) != len(self.ids) \
+                or len(self.ids) > capacity or len(self.ids) < self.meta[1]:
+            rows = min(self.INITIAL_ROWS, capacity)
+            self.vectors = self._open(os.path.join(path, 'vectors.npy'), np.float32, (rows, dim), 0, reset=True)
+            self.ids = self._open(os.path.join(path, 'ids.npy'), np.int64, (rows,), -1, reset=True)
+            self.meta[:] = 0
+        self._pending = 0
+
+    @staticmethod
+    def _open(file_path: str, dtype, shape: tuple, fill, reset: bool = False) -> np.memmap:
+        if os.path.exists(file_path) and not reset:
+            array = open_memmap(file_path, mode='r+')
+            if array.shape == shape and array.dtype == dtype:
+                return array
+            del array
+        array = open_memmap(file_path, mode='w+', dtype=dtype, shape=shape)
+        array[:] = fill
+        return array
+
+    @staticmethod
+    def _load(file_path: str, dtype, row_shape: tuple):
+        """An existing array of any number of rows shaped `row_shape`, or None"""
+        if not os.path.exists(file_path):
+            return None
+        array = open_memmap(file_path, mode='r+')
+        if array.dtype != dtype or array.shape[1:] != row_shape:
+            return None
+        return array
+
+    def _grow(self, array: np.memmap, name: str, rows: int, fill) -> np.memmap:
+        """Copy `array` into a larger file that replaces it"""
+        file_path = os.path.join(self.path, name)
+        grown = open_memmap(file_path + '.tmp', mode='w+', dtype=array.dtype, shape=(rows,) + array.shape[1:])
+        grown[:len(array)] = array
+        grown[len(array):] = fill
+        grown.flush()
+        os.replace(file_path + '.tmp', file_path)
+        return grown
+
+    def add(self, row_id: int, vector: np.ndarray):
+        slot = int(self.meta[0])
+        if slot == len(self.ids) < self.capacity:
+            rows = min(self.capacity, 2 * slot)
+            self.vectors = self._grow(self.vectors, 'vectors.npy', rows, 0)
+            self.ids = self._grow(self.ids, 'ids.npy', rows, -1)
+        self.vectors[slot] = vector
+        self.ids[slot] = row_id
+        self.meta[0] = (slot + 1) % self.capacity
+        self.meta[1] = min(int(self.meta[1]) + 1, self.capacity)
+        self._pending += 1
+        if self._pending >= self.FLUSH_EVERY:
+            self.flush()
+
+    def search(self, query: np.ndarray, k: int, exclude_ids=(), min_score: float = 0.1) -> list[tuple[int, float]]:
+        count = int(self.meta[1])
+        if count == 0 or k <= 0:
+            return []
+        scores = self.vectors[:count] @ query
+        ids = self.ids[:count]
+        if exclude_ids:
+            scores[np.isin(ids, np.fromiter(exclude_ids, dtype=np.int64))] = -np.inf
+        k = min(k, count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top if scores[i] >= min_score]
+
+    def flush(self):
+        for array in (self.vectors, self.ids, self.meta):
+            array.flush()
+        self._pending = 0
+
+class MessageIndex:
+    """
+    Per-chat embedding index over stored messages, used to retrieve relevant older context.
+    A chat's index is filled from its already stored messages when it is first created.
+    """
+
+    def __init__(self, index_dir: str = 'database/index', dim: int = 512, capacity: int = 5000, max_open_chats: int = 32, db=None):
+        self.logger = setup_logger()
+        # Source of the messages stored before a chat's index was created
+        self.db = db
+        self.index_dir = index_dir
+        self.encoder = HashedNgramEncoder(dim)
+        self.capacity = capacity
+        self.max_open_chats = max_open_chats
+        self._chats: OrderedDict[int, ChatIndex] = OrderedDict()
+        self._lock = threading.Lock()
+        self.logger.info(f"Message index initialized at {index_dir} (dim={dim}, capacity={capacity} messages per chat)")
+
+    def _get_chat(self, chat_id: int, before_id: int = None) -> ChatIndex:
+        chat = self._chats.get(chat_id)
+        if chat is not None:
+            self._chats.move_to_end(chat_id)
+            return chat
+        chat = ChatIndex(os.path.join(self.index_dir, str(chat_id)), self.encoder.dim, self.capacity)
+        if int(chat.meta[1]) == 0 and self.db is not None:
+            self._backfill(chat_id, chat, before_id)
+        self._chats[chat_id] = chat
+        while len(self._chats) > self.max_open_chats:
+            _, evicted = self._chats.popitem(last=False)
+            evicted.flush()
+        return chat
+
+    def _backfill(self, chat_id: int, chat: ChatIndex, before_id: int = None):
+        """Index the chat's messages stored before its index existed, up to the index capacity"""
+        count = 0
+        for row_id, text in self.db.get_message_texts(chat_id, self.capacity, before_id):
+            if text and text.strip():
+                chat.add(row_id, self.encoder.encode(text))
+                count += 1
+        if count:
+            chat.flush()
+            self.logger.info(f"Indexed {count} earlier messages of chat {chat_id}")
+
+    def add(self, chat_id: int, row_id: int, text: str):
+        """Index a stored message; called for every `store_message`"""
+        if not text or not text.strip():
+            return
+        vector = self.encoder.encode(text)
+        with self._lock:
+            # The message itself is already stored, keep the backfill from indexing it twice
+            self._get_chat(chat_id, before_id=row_id).add(row_id, vector)
+
+    def search(self, chat_id: int, query: str, k: int = 5, exclude_ids=()) -> list[int]:
+        """Return the row ids of the `k` stored messages most similar to `query`"""
+        vector = self.encoder.encode(query)
+        with self._lock:
+            results = self._get_chat(chat_id).search(vector, k, exclude_ids)
+        self.logger.debug(f"Index search in chat {chat_id} for '{query[:50]}': {results}")
+        return [row_id for row_id, _ in results]
+
+    def close(self):
+        with self._lock:
+            for chat in self._chats.values():
+                chat.flush()
+            self._chats.clear()
@@ -0,0 +1,288 @@
+import asyncio
+import bisect
+import hashlib
+import json
+import multiprocessing
+import os
+import queue
+import resource
+import signal
+import time
+from typing import Optional
+
+import aiohttp
+from aiohttp import web
+
+from app.logger import setup_logger
+
+# Worker load reports are sent, and logged by the supervisor, this often
+REPORT_SECONDS = float(os.getenv('SUPERVISOR_REPORT_SECONDS', '60'))
+# Put on a worker's queue to make it finish its updates and exit
+STOP = None
+
+class HashRing:
+    """
+    Consistent hash ring mapping keys to nodes. Every node owns `replicas` points on the ring,
+    so changing the number of nodes only moves about 1/N of the keys to another node.
+    """
+
+    def __init__(self, nodes: list[int], replicas: int = 100):
+        points = sorted((self._hash(f"{node}:{i}"), node) for node in nodes for i in range(replicas))
+        self._hashes = [h for h, _ in points]
+        self._nodes = [node for _, node in points]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+    def node(self, key) -> int:
+        i = bisect.bisect(self._hashes, self._hash(str(key))) % len(self._hashes)
+        return self._nodes[i]
+
+def chat_id_of(update: dict) -> Optional[int]:
+    """Find the chat an update belongs to without parsing it into telegram objects"""
+    for key, value in update.items():
+        if key == 'update_id' or not isinstance(value, dict):
+            continue
+        chat = value.get('chat') or (value.get('message') or {}).get('chat')
+        if chat:
+            return chat['id']
+        user = value.get('from') or value.get('user')
+        if user:
+            return user['id']
+    return None
+
+def run_worker(index: int, token: str, db_path: str, translate_api_url: str,
+               updates: multiprocessing.Queue, reports: multiprocessing.Queue):
+    """Entry point of a worker process: a full bot fed from `updates` instead of polling Telegram"""
+    from app.bot import Bot
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the supervisor decides when workers stop
+    bot = Bot(token, db_path=db_path, translate_api_url=translate_api_url)
+    # Media quotas and recompression act on the shared store, so only one worker runs them
+    bot.maintenance = index == 0
+    asyncio.run(_work(bot, index, updates, reports))
+
+async def _work(bot, index: int, updates: multiprocessing.Queue, reports: multiprocessing.Queue):
+    from telegram import Update
+
+    application = bot.application
+    await application.initialize()
+    try:
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        bot.logger.info(f"Worker {index} started (pid {os.getpid()})")
+        processed, last_report = 0, time.monotonic()
+        while True:
+            try:
+                payload = await asyncio.to_thread(updates.get, True, 1.0)
+            except queue.Empty:
+                payload = ()
+            if payload is STOP:
+                break
+            if payload:
+                await application.update_queue.put(Update.de_json(payload, application.bot))
+                processed += 1
+            if time.monotonic() - last_report >= min(REPORT_SECONDS, 5):
+                usage = resource.getrusage(resource.RUSAGE_SELF)
+                reports.put({
+                    'worker': index,
+                    'processed': processed,
+                    'pending': application.update_queue.qsize(),
+                    'tasks': len(asyncio.all_tasks()),
+                    'cpu_seconds': round(usage.ru_utime + usage.ru_stime, 1),
+                    'max_rss_mb': round(usage.ru_maxrss / 1024, 1),
+                })
+                last_report = time.monotonic()
+    finally:
+        if application.running:
+            await application.stop()
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+
+class Worker:
+    """Supervisor-side handle of one worker process"""
+
+    def __init__(self, index: int, context):
+        self.index = index
+        self.updates = context.Queue()
+        self.process = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.crashes_in_a_row = 0
+        self.restart_at = 0.0
+        self.dispatched = 0
+        self.load = {}
+
+class Supervisor:
+    """
+    Receives updates once and shards them over BOT_WORKERS worker processes, so image decoding,
+    regexes and JSON handling for different chats run on different cores.
+
+    Updates are fetched as raw JSON with getUpdates and routed by a consistent hash of their
+    chat id, so each chat is always served by the same worker, in order. Crashed workers are
+    restarted with a growing delay if they keep crashing; the updates they had not handled yet
+    are lost. Per-worker load is logged every SUPERVISOR_REPORT_SECONDS
+    and served as JSON on SUPERVISOR_STATUS_PORT.
+    """
+
+    def __init__(self, token: str, db_path: str = 'database/messages.db', translate_api_url: str = ''):
+        self.logger = setup_logger()
+        self.token = token
+        self.db_path = db_path
+        self.translate_api_url = translate_api_url
+        self.api_url = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org').rstrip('/')
+        self.status_port = int(os.getenv('SUPERVISOR_STATUS_PORT', '0'))
+        self.context = multiprocessing.get_context('spawn')
+        count = int(os.getenv('BOT_WORKERS', str(os.cpu_count() or 2)))
+        self.workers = [Worker(i, self.context) for i in range(count)]
+        self.ring = HashRing([worker.index for worker in self.workers])
+        self.reports = self.context.Queue()
+        self.offset = 0
+
+    def start_worker(self, worker: Worker):
+        worker.process = self.context.Process(
+            target=run_worker, name=f"bot-worker-{worker.index}", daemon=True,
+            args=(worker.index, self.token, self.db_path, self.translate_api_url, worker.updates, self.reports),
+        )
+        worker.process.start()
+        worker.started_at = time.monotonic()
+        self.logger.info(f"Started worker {worker.index} (pid {worker.process.pid})")
+
+    def dispatch(self, update: dict):
+        chat_id = chat_id_of(update)
+        worker = self.workers[self.ring.node(chat_id if chat_id is not None else update['update_id'])]
+        worker.updates.put(update)
+        worker.dispatched += 1
+
+    async def _poll(self, session: aiohttp.ClientSession, stop: asyncio.Event):
+        from telegram import Update
+
+        async with session.post(f"{self.api_url}/bot{self.token}/deleteWebhook") as response:
+            response.raise_for_status()
+        allowed_updates = json.dumps(Update.ALL_TYPES)
+        while not stop.is_set():
+            try:
+                params = {'offset': self.offset, 'timeout': 30, 'allowed_updates': allowed_updates}
+                async with session.get(f"{self.api_url}/bot{self.token}/getUpdates", params=params) as response:
+                    body = await response.json()
+                if not body.get('ok'):
+                    raise RuntimeError(body.get('description'))
+                for update in body['result']:
+                    self.dispatch(update)
+                    self.offset = update['update_id'] + 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Error fetching updates: {e}")
+                await asyncio.sleep(5)
+
+    async def _watch(self, stop: asyncio.Event):
+        last_log = time.monotonic()
+        while not stop.is_set():
+            now = time.monotonic()
+            for worker in self.workers:
+                if worker.process.is_alive():
+                    continue
+                if not worker.restart_at:
+                    # Back off when a worker dies soon after starting, it would likely crash again
+                    crashed_early = now - worker.started_at < 30
+                    worker.crashes_in_a_row = worker.crashes_in_a_row + 1 if crashed_early else 1
+                    delay = min(60, 2 ** (worker.crashes_in_a_row - 1))
+                    worker.restart_at = now + delay
+                    self.logger.error(f"Worker {worker.index} exited with code {worker.process.exitcode}, "
+                                      f"restarting in {delay}s")
+                elif now >= worker.restart_at:
+                    # A worker killed inside get() leaves the queue's read lock held, so start afresh
+                    try:
+                        lost = worker.updates.qsize()
+                    except NotImplementedError:
+                        lost = 'unknown'
+                    if lost:
+                        self.logger.warning(f"Dropping {lost} updates queued for worker {worker.index}")
+                    worker.updates = self.context.Queue()
+                    worker.restart_at = 0.0
+                    worker.restarts += 1
+                    self.start_worker(worker)
+            while True:
+                try:
+                    report = self.reports.get_nowait()
+                except queue.Empty:
+                    break
+                self.workers[report['worker']].load = report
+            if now - last_log >= REPORT_SECONDS:
+                for line in self.status()['workers']:
+                    self.logger.info(f"Worker load: {line}")
+                last_log = now
+            await asyncio.sleep(1)
+
+    def status(self) -> dict:
+        workers = []
+        for worker in self.workers:
+            try:
+                queued = worker.updates.qsize()
+            except NotImplementedError:
+                queued = None
+            workers.append({
+                'worker': worker.index,
+                'pid': worker.process.pid if worker.process else None,
+                'alive': bool(worker.process and worker.process.is_alive()),
+                'restarts': worker.restarts,
+                'dispatched': worker.dispatched,
+                'queued': queued,
+                **{k: v for k, v in worker.load.items() if k != 'worker'},
+            })
+        return {'offset': self.offset, 'workers': workers}
+
+    async def _handle_status(self, request: web.Request) -> web.Response:
+        status = self.status()
+        healthy = all(worker['alive'] for worker in status['workers'])
+        return web.json_response(status, status=200 if healthy else 503)
+
+    async def serve(self, stop: asyncio.Event):
+        """Run the workers and feed them updates until `stop` is set"""
+        for worker in self.workers:
+            self.start_worker(worker)
+        runner = None
+        if self.status_port:
+            app = web.Application()
+            app.router.add_get('/health', self._handle_status)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            await web.TCPSite(runner, '0.0.0.0', self.status_port).start()
+
+        timeout = aiohttp.ClientTimeout(total=60)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            tasks = [asyncio.create_task(self._poll(session, stop)), asyncio.create_task(self._watch(stop))]
+            self.logger.info(f"Supervisor running with {len(self.workers)} workers")
+            await stop.wait()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if runner:
+            await runner.cleanup()
+        await self.shutdown()
+
+    async def shutdown(self, timeout: float = 30):
+        for worker in self.workers:
+            worker.updates.put(STOP)
+        for worker in self.workers:
+            await asyncio.to_thread(worker.process.join, timeout)
+            if worker.process.is_alive():
+                self.logger.warning(f"Worker {worker.index} did not stop in {timeout}s, terminating")
+                worker.process.terminate()
+        self.logger.info("All workers stopped")
+
+    def run(self):
+        """Supervise until SIGINT or SIGTERM"""
+        async def main():
+            stop = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, stop.set)
+            await self.serve(stop)
+
+        asyncio.run(main())
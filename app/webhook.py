@@ -0,0 +1,120 @@
+import asyncio
+import hmac
+import os
+import secrets
+import signal
+
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+
+from app.logger import setup_logger
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+class WebhookServer:
+    """
+    Receives updates from Telegram over HTTPS POSTs instead of long polling.
+
+    An aiohttp server accepts updates on WEBHOOK_PATH, checks the secret token Telegram
+    sends with every request, and hands them to the application's update queue. It
+    answers as soon as the update is queued, so Telegram can keep up to
+    WEBHOOK_MAX_CONNECTIONS requests in flight. GET /health reports whether the
+    application is running and how many updates are waiting, for load balancer checks.
+    TLS is expected to be terminated in front of it.
+    """
+
+    def __init__(self, application: Application):
+        self.logger = setup_logger()
+        self.application = application
+        self.url = os.getenv('WEBHOOK_URL', '').rstrip('/')
+        self.listen = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+        self.port = int(os.getenv('WEBHOOK_PORT', '8080'))
+        self.path = os.getenv('WEBHOOK_PATH', '/telegram')
+        allowed_updates = os.getenv('WEBHOOK_ALLOWED_UPDATES', '')
+        # Reactions are only delivered when asked for explicitly, so default to every type
+        self.allowed_updates = [u.strip() for u in allowed_updates.split(',') if u.strip()] or Update.ALL_TYPES
+        self.max_connections = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', '40'))
+        # Leave the registration to another replica or to a test harness
+        self.register = os.getenv('WEBHOOK_REGISTER', 'on') == 'on'
+        self.secret = os.getenv('WEBHOOK_SECRET', '')
+        if not self.secret:
+            if not self.register:
+                # Each replica would make up its own secret and reject every update registered by another
+                raise ValueError("WEBHOOK_SECRET environment variable must be set when WEBHOOK_REGISTER is off")
+            self.secret = secrets.token_urlsafe(32)
+        self.received = 0
+        self.rejected = 0
+
+    def web_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self.handle_update)
+        app.router.add_get('/health', self.handle_health)
+        return app
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        token = request.headers.get(SECRET_HEADER, '')
+        if not hmac.compare_digest(token.encode(), self.secret.encode()):
+            self.rejected += 1
+            self.logger.warning(f"Rejected webhook request from {request.remote}: bad secret token")
+            return web.Response(status=403)
+        try:
+            update = Update.de_json(await request.json(), self.application.bot)
+        except Exception as e:
+            self.logger.error(f"Could not parse webhook update: {e}")
+            return web.Response(status=400)
+        self.received += 1
+        await self.application.update_queue.put(update)
+        return web.Response()
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        running = self.application.running
+        return web.json_response({
+            'status': 'ok' if running else 'starting',
+            'pending_updates': self.application.update_queue.qsize(),
+            'received': self.received,
+            'rejected': self.rejected,
+        }, status=200 if running else 503)
+
+    async def serve(self, stop: asyncio.Event):
+        """Run the application behind the webhook server until `stop` is set"""
+        application = self.application
+        runner = web.AppRunner(self.web_app())
+        await application.initialize()
+        try:
+            if application.post_init:
+                await application.post_init(application)
+            await runner.setup()
+            await web.TCPSite(runner, self.listen, self.port).start()
+            if self.register:
+                if not self.url:
+                    raise ValueError("WEBHOOK_URL environment variable is not set")
+                await application.bot.set_webhook(
+                    url=f"{self.url}{self.path}",
+                    secret_token=self.secret,
+                    allowed_updates=self.allowed_updates,
+                    max_connections=self.max_connections,
+                )
+            await application.start()
+            self.logger.info(f"Webhook server listening on {self.listen}:{self.port}{self.path}")
+            await stop.wait()
+        finally:
+            await runner.cleanup()
+            if application.running:
+                await application.stop()
+                if application.post_stop:
+                    await application.post_stop(application)
+            await application.shutdown()
+            if application.post_shutdown:
+                await application.post_shutdown(application)
+
+    def run(self):
+        """Serve until SIGINT or SIGTERM"""
+        async def main():
+            stop = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, stop.set)
+            await self.serve(stop)
+
+        asyncio.run(main())
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Measure peak RSS of concurrent large media uploads with the old in-memory path
+(download_as_bytearray + store_file + load_file) and with the streaming media store
+(chunked download to a temp file, atomic rename, memory-mapped reads).
+
+    python -m scripts.benchmark_media_io [--uploads 8] [--size-mb 20]
+
+A local HTTP server stands in for the Telegram file endpoint. Each mode runs in its own
+subprocess so the peak RSS figures do not influence each other.
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from aiohttp import web
+
+def serve(directory: str, port_holder: list, ready: threading.Event):
+    async def start():
+        app = web.Application()
+        app.router.add_static('/file', directory)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port_holder.append(site._server.sockets[0].getsockname()[1])
+        ready.set()
+
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(start())
+    loop.run_forever()
+
+class FakeFile:
+    def __init__(self, url):
+        self.file_path = url
+
+    async def download_as_bytearray(self):
+        import aiohttp
+        async with aiohttp.ClientSession() as session:
+            async with session.get(self.file_path) as resp:
+                return bytearray(await resp.read())
+
+class FakeBot:
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    async def get_file(self, file_id):
+        return FakeFile(f"{self.base_url}/{file_id}")
+
+async def run_legacy(bot, names, root):
+    from app.handlers.utils import store_file, load_file
+
+    async def one(name):
+        data = await (await bot.get_file(name)).download_as_bytearray()
+        path = os.path.join(root, 'legacy', name)
+        store_file(path, data)
+        return hashlib.sha256(load_file(path)).hexdigest()
+
+    return await asyncio.gather(*(one(name) for name in names))
+
+async def run_streaming(bot, names, root):
+    from app.services.media_store import MediaStore
+
+    store = MediaStore(db=None, root=root)
+
+    async def one(name):
+        digest, _ = await store.download(bot, name)
+        buffer = await asyncio.to_thread(store.open_object, store.object_path(digest))
+        # Touch every page so the mapping is actually read, like a consumer would
+        return await asyncio.to_thread(lambda: hashlib.sha256(buffer).hexdigest())
+
+    try:
+        return await asyncio.gather(*(one(name) for name in names))
+    finally:
+        await store.close()
+
+def child(mode: str, base_url: str, names: list, root: str):
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    runner = run_legacy if mode == 'legacy' else run_streaming
+    digests = asyncio.run(runner(FakeBot(base_url), names, root))
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{mode:<10} peak RSS {peak / 1024:8.1f} MB (+{(peak - baseline) / 1024:.1f} MB over startup), "
+          f"{elapsed:.2f}s, {len(set(digests))} distinct files")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--uploads', type=int, default=8)
+    parser.add_argument('--size-mb', type=int, default=20)
+    parser.add_argument('--child', nargs=3, metavar=('MODE', 'URL', 'ROOT'))
+    parser.add_argument('names', nargs='*')
+    args = parser.parse_args()
+
+    if args.child:
+        mode, base_url, root = args.child
+        child(mode, base_url, args.names, root)
+        return
+
+    with tempfile.TemporaryDirectory() as source, tempfile.TemporaryDirectory() as target:
+        names = []
+        for i in range(args.uploads):
+            name = f"upload{i}.bin"
+            with open(os.path.join(source, name), 'wb') as f:
+                for _ in range(args.size_mb):
+                    f.write(os.urandom(1024 * 1024))
+            names.append(name)
+
+        port, ready = [], threading.Event()
+        threading.Thread(target=serve, args=(source, port, ready), daemon=True).start()
+        ready.wait()
+        base_url = f"http://127.0.0.1:{port[0]}/file"
+
+        print(f"{args.uploads} concurrent uploads of {args.size_mb} MB")
+        for mode in ('legacy', 'streaming'):
+            subprocess.run([sys.executable, '-m', 'scripts.benchmark_media_io', '--child', mode, base_url,
+                            os.path.join(target, mode), *names], check=True)
+
+if __name__ == '__main__':
+    main()
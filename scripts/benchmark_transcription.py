@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Compare voice transcription latency of a single request with silence-split,
+concurrent segment transcription, for increasing audio lengths.
+
+    python -m scripts.benchmark_transcription [audio.ogg ...] [--durations 30 120 300 600] [--simulate]
+
+Without audio files, synthetic OGG/Opus audio (5s of tone followed by 1s of silence)
+is generated with ffmpeg for each duration. Transcription goes through the configured
+STT providers and needs their API keys; with --simulate the backend is replaced by a sleep proportional to the
+audio length (0.5s + 0.1s per audio second), which isolates the splitting overhead.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from ffmpeg.asyncio import FFmpeg
+
+from app.handlers.voice_segments import detect_silences
+
+async def synthetic_audio(seconds: int) -> bytes:
+    return await (FFmpeg()
+                  .input(f"aevalsrc='0.5*sin(2*PI*220*t)*lt(mod(t,6),5)':s=16000:d={seconds}", f="lavfi")
+                  .output("pipe:1", {"c:a": "libopus", "b:a": "32k", "application": "voip"}, f="ogg")
+                  .execute())
+
+async def audio_duration(audio: bytes) -> float:
+    with tempfile.NamedTemporaryFile(suffix='.ogg') as f:
+        f.write(audio)
+        f.flush()
+        duration, _ = await detect_silences(f.name)
+    return duration
+
+def simulated_backend(bytes_per_second: dict):
+    async def transcribe(voice_bytes, timeout=None, chat_id=None):
+        audio_seconds = len(voice_bytes) / bytes_per_second['rate']
+        await asyncio.sleep(0.5 + 0.1 * audio_seconds)
+        return f"segment of {audio_seconds:.0f} seconds", "simulated"
+    return transcribe
+
+async def measure(handler, audio: bytes, split: bool) -> float:
+    handler.SPLIT_MIN_BYTES = 0 if split else len(audio) + 1
+    start = time.perf_counter()
+    await handler.transcribe_voice(audio)
+    return time.perf_counter() - start
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('files', nargs='*')
+    parser.add_argument('--durations', type=int, nargs='+', default=[30, 120, 300, 600])
+    parser.add_argument('--simulate', action='store_true')
+    args = parser.parse_args()
+
+    if args.simulate:
+        os.environ.setdefault('GEMINI_API_KEY', 'simulated')
+    from app.handlers.voice_handler import VoiceHandler
+    handler = VoiceHandler()  # no db, so nothing is served from the transcript cache
+    bytes_per_second = {'rate': 1}
+    if args.simulate:
+        handler._transcribe = simulated_backend(bytes_per_second)
+
+    samples = []
+    for path in args.files:
+        with open(path, 'rb') as f:
+            samples.append((path, f.read()))
+    if not samples:
+        for seconds in args.durations:
+            samples.append((f"synthetic {seconds}s", await synthetic_audio(seconds)))
+
+    print(f"{'audio':<24} {'length':>8} {'single':>9} {'split':>9} {'speedup':>8}")
+    for name, audio in samples:
+        duration = await audio_duration(audio)
+        bytes_per_second['rate'] = len(audio) / duration
+        single = await measure(handler, audio, split=False)
+        split = await measure(handler, audio, split=True)
+        print(f"{name:<24} {duration:>7.0f}s {single:>8.2f}s {split:>8.2f}s {single / split:>7.1f}x")
+
+if __name__ == '__main__':
+    asyncio.run(main())
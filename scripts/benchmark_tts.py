@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Compare time-to-first-audio and total time of text-to-speech for a long text:
+one provider call, sentence chunks synthesized concurrently, and chunks with the
+first one delivered early.
+
+    python -m scripts.benchmark_tts [text.txt] [--provider gtts] [--chunk-chars 400] [--simulate]
+
+Without a text file a multi-paragraph answer is generated. With --simulate the provider is
+replaced by a sleep of 0.4s + 4ms per character, which models a hosted TTS API.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+SENTENCE = ("Η απάντηση στην ερώτηση σου εξαρτάται από αρκετούς παράγοντες, όπως το κόστος και ο χρόνος. "
+            "The main trade-off is latency versus quality, so we measure both. ")
+
+def simulated_provider(provider):
+    async def generate_speech(text, timeout=None):
+        await asyncio.sleep(0.4 + 0.004 * len(text))
+        return b'ID3\x04\x00\x00\x00\x00\x00\x00' + b'\xff\xfb' * len(text)
+    provider.generate_speech = generate_speech
+
+async def measure(tts, text: str, chunk_chars: int, early: bool) -> tuple[float, float, int]:
+    tts.chunk_chars = chunk_chars
+    start = time.perf_counter()
+    first, size = None, 0
+    async for part in tts.generate_speech_parts(text, early=early):
+        first = first or time.perf_counter() - start
+        size += len(part)
+    return first or 0.0, time.perf_counter() - start, size
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('text', nargs='?')
+    parser.add_argument('--provider')
+    parser.add_argument('--chunk-chars', type=int, default=400)
+    parser.add_argument('--simulate', action='store_true')
+    args = parser.parse_args()
+
+    text = open(args.text).read() if args.text else SENTENCE * 12
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # A throwaway cache, so every run really synthesizes
+        os.environ['TTS_CACHE_DIR'] = cache_dir
+        from app.handlers.tts import TTSHandler
+        tts = TTSHandler()
+        if args.provider:
+            tts.set_provider(args.provider)
+        provider = tts.providers[tts.current_provider]
+        if args.simulate:
+            simulated_provider(provider)
+
+        print(f"{len(text)} characters with {provider.name} (max {provider.MAX_CONCURRENCY} concurrent requests)")
+        print(f"{'mode':<22} {'first audio':>12} {'total':>9} {'bytes':>10}")
+        for label, chunk_chars, early in (("single request", len(text) + 1, False),
+                                          (f"chunks of {args.chunk_chars}", args.chunk_chars, False),
+                                          ("chunks, first early", args.chunk_chars, True)):
+            tts.cache.root = tempfile.mkdtemp(dir=cache_dir)
+            first, total, size = await measure(tts, text, chunk_chars, early)
+            print(f"{label:<22} {first:>11.2f}s {total:>8.2f}s {size:>10}")
+
+if __name__ == '__main__':
+    asyncio.run(main())
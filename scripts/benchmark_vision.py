@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Compare upload size and latency of the old vision input path (lossless PNG re-encode)
+with the preprocessing stage (downsize + tuned JPEG, no metadata).
+
+    python -m scripts.benchmark_vision [image.jpg] [--backend GEMINI] [--runs 3]
+
+Without an image a synthetic 2560x1920 photo with EXIF is generated. With --backend,
+end-to-end vision latency is also measured against the real API (needs its API key).
+"""
+import argparse
+import asyncio
+import base64
+import io
+import time
+
+from PIL import Image
+
+from app.brain.image_preprocessing import preprocess_image_sync, preprocess_images
+
+def synthetic_photo(width=2560, height=1920) -> bytes:
+    gradient = Image.linear_gradient('L').resize((width, height))
+    noise = Image.effect_noise((width, height), 40)
+    image = Image.merge('RGB', (gradient, noise, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    exif = Image.Exif()
+    exif[0x0110] = "Benchmark Camera"  # Model
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=95, exif=exif)
+    return output.getvalue()
+
+def legacy_png(image_bytes: bytes) -> bytes:
+    buffered = io.BytesIO()
+    Image.open(io.BytesIO(image_bytes)).save(buffered, format="PNG")
+    return buffered.getvalue()
+
+def timed(func, *args, runs=5):
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = func(*args)
+    return result, (time.perf_counter() - start) / runs
+
+async def end_to_end(backend: str, image_bytes: bytes, runs: int):
+    from app.brain.factory import get_brain_handler
+    brain = get_brain_handler(backend)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await brain.process_images([image_bytes], "Describe this image in one sentence.")
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('image', nargs='?')
+    parser.add_argument('--backend')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.image:
+        with open(args.image, 'rb') as f:
+            original = f.read()
+    else:
+        original = synthetic_photo()
+
+    png, png_time = timed(legacy_png, original)
+    print(f"original:        {len(original):>10} bytes")
+    print(f"legacy PNG:      {len(png):>10} bytes, base64 {len(base64.b64encode(png)):>10} bytes, {png_time * 1000:.1f} ms")
+    for max_side in (1024, 1280, 1536):
+        jpeg, jpeg_time = timed(preprocess_image_sync, original, max_side)
+        print(f"JPEG <= {max_side}px:  {len(jpeg):>10} bytes, base64 {len(base64.b64encode(jpeg)):>10} bytes, {jpeg_time * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    asyncio.run(preprocess_images([original] * 8))
+    print(f"8 images through the thread pool: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    if args.backend:
+        timings = asyncio.run(end_to_end(args.backend, original, args.runs))
+        print(f"{args.backend} end-to-end vision latency: "
+              f"avg {sum(timings) / len(timings):.2f}s, min {min(timings):.2f}s, max {max(timings):.2f}s")
+
+if __name__ == '__main__':
+    main()
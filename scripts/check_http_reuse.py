@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Check that outbound services reuse connections through the shared HTTP session manager.
+
+    python -m scripts.check_http_reuse [--requests 50]
+
+A local HTTP server stands in for the translation API and Giphy and records the client port
+of every request, so the number of distinct ports is the number of TCP connections opened.
+The same calls are then made the old way, with a new aiohttp session per call, for comparison.
+A flaky endpoint checks that transient 503 answers are retried.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import aiohttp
+from aiohttp import web
+
+class StandIn:
+    def __init__(self):
+        self.ports = set()
+        self.requests = 0
+        self.flaky_calls = 0
+
+    def record(self, request: web.Request):
+        self.requests += 1
+        self.ports.add(request.transport.get_extra_info('peername')[1])
+
+    async def translate(self, request: web.Request) -> web.Response:
+        self.record(request)
+        payload = await request.json()
+        return web.json_response({'translated_text': payload['text'].upper(),
+                                  'source_language': 'el', 'destination_language': payload['dest']})
+
+    async def giphy(self, request: web.Request) -> web.Response:
+        self.record(request)
+        return web.json_response({'data': {'images': {'original': {'url': 'https://example.com/laugh.gif'}}}})
+
+    async def flaky(self, request: web.Request) -> web.Response:
+        self.record(request)
+        self.flaky_calls += 1
+        if self.flaky_calls % 2:
+            return web.Response(status=503)
+        return web.json_response({'translated_text': 'ok', 'source_language': 'el', 'destination_language': 'en'})
+
+    def reset(self):
+        self.ports, self.requests = set(), 0
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+
+    stand_in = StandIn()
+    app = web.Application()
+    app.router.add_post('/translate', stand_in.translate)
+    app.router.add_get('/gifs/random', stand_in.giphy)
+    app.router.add_post('/flaky/translate', stand_in.flaky)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    base = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    os.environ.setdefault('GIPHY_API_KEY', 'stand-in')
+    from app.handlers.translate import TranslateHandler
+    from app.services.giphy import GiphyService
+    from app.services.http import HTTPSessionManager
+
+    http = HTTPSessionManager()
+    translator = TranslateHandler(base, http=http)
+    giphy = GiphyService(http=http)
+    giphy.base_url = f"{base}/gifs"
+
+    async def calls():
+        for i in range(args.requests):
+            assert (await translator.translate(f"μήνυμα {i}", "en"))['translated_text']
+            assert await giphy.get_random_gif('laugh')
+        # A burst, as when several chats are active at once
+        await asyncio.gather(*(translator.translate("burst", "en") for _ in range(20)))
+
+    start = time.perf_counter()
+    await calls()
+    shared = time.perf_counter() - start
+    print(f"shared sessions:  {stand_in.requests} requests over {len(stand_in.ports)} connections in {shared:.2f}s")
+
+    stand_in.reset()
+    start = time.perf_counter()
+    for i in range(args.requests):
+        for method, url, kwargs in (('POST', f"{base}/translate", {'json': {'text': 'x', 'dest': 'en'}}),
+                                    ('GET', f"{base}/gifs/random", {})):
+            async with aiohttp.ClientSession() as session:
+                async with session.request(method, url, **kwargs) as response:
+                    await response.json()
+    async def burst():
+        async with aiohttp.ClientSession() as session:
+            async with session.post(f"{base}/translate", json={'text': 'burst', 'dest': 'en'}) as response:
+                await response.json()
+    await asyncio.gather(*(burst() for _ in range(20)))
+    per_call = time.perf_counter() - start
+    print(f"session per call: {stand_in.requests} requests over {len(stand_in.ports)} connections in {per_call:.2f}s")
+
+    flaky = TranslateHandler(f"{base}/flaky", http=http)
+    result = await flaky.translate("retry me", "en")
+    print(f"flaky endpoint: {'recovered' if result else 'failed'} after {stand_in.flaky_calls} attempts")
+
+    await http.close()
+    await runner.cleanup()
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Exercise the webhook server locally: POST synthetic updates with the right secret token, one
+with a wrong token and one malformed, check /health, and time how long the replies take.
+
+    python -m scripts.webhook_harness [--updates 200] [--concurrency 40]
+
+A local HTTP server stands in for the Telegram Bot API, answering getMe, setWebhook and
+sendMessage. The application only has an echo handler, so the figures are the webhook and
+dispatch overhead, without any brain latency.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import time
+
+import aiohttp
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application, MessageHandler, filters
+
+SECRET = 'harness-secret'
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+class FakeBotAPI:
+    """Just enough of the Bot API for the application to start and reply"""
+
+    def __init__(self):
+        self.webhook = None
+        self.sent = 0
+        self.all_sent = asyncio.Event()
+        self.expected = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        data = await request.post() if request.can_read_body else {}
+        if method == 'getMe':
+            result = {'id': 1, 'is_bot': True, 'first_name': 'Harness', 'username': 'harness_bot'}
+        elif method == 'setWebhook':
+            self.webhook = dict(data)
+            result = True
+        elif method == 'sendMessage':
+            self.sent += 1
+            if self.sent >= self.expected:
+                self.all_sent.set()
+            result = {'message_id': self.sent, 'date': int(time.time()),
+                      'chat': {'id': int(data['chat_id']), 'type': 'private'}, 'text': data.get('text')}
+        else:
+            result = True
+        return web.json_response({'ok': True, 'result': result})
+
+async def echo(update: Update, context):
+    await update.message.reply_text(update.message.text)
+
+def synthetic_update(update_id: int) -> dict:
+    chat_id = 1000 + update_id % 10
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'User'},
+            'text': f"message {update_id}",
+        },
+    }
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--updates', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=40)
+    args = parser.parse_args()
+
+    api = FakeBotAPI()
+    api.expected = args.updates
+    api_app = web.Application()
+    api_app.router.add_post('/bot{token}/{method}', api.handle)
+    api_runner = web.AppRunner(api_app)
+    await api_runner.setup()
+    api_port = free_port()
+    await web.TCPSite(api_runner, '127.0.0.1', api_port).start()
+
+    webhook_port = free_port()
+    os.environ.update({
+        'WEBHOOK_URL': f"http://127.0.0.1:{webhook_port}",
+        'WEBHOOK_LISTEN': '127.0.0.1',
+        'WEBHOOK_PORT': str(webhook_port),
+        'WEBHOOK_SECRET': SECRET,
+        'WEBHOOK_MAX_CONNECTIONS': str(args.concurrency),
+    })
+    from app.webhook import WebhookServer, SECRET_HEADER
+
+    application = (Application.builder().token('1:harness')
+                   .base_url(f"http://127.0.0.1:{api_port}/bot").updater(None).build())
+    application.add_handler(MessageHandler(filters.TEXT, echo, block=False))
+    server = WebhookServer(application)
+    stop = asyncio.Event()
+    serving = asyncio.create_task(server.serve(stop))
+
+    base = f"http://127.0.0.1:{webhook_port}"
+    async with aiohttp.ClientSession() as session:
+        for _ in range(100):
+            try:
+                async with session.get(f"{base}/health") as response:
+                    if response.status == 200:
+                        break
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.05)
+        print(f"registered webhook: {api.webhook}")
+
+        async with session.post(f"{base}{server.path}", json=synthetic_update(0),
+                                headers={SECRET_HEADER: 'wrong'}) as response:
+            print(f"wrong secret token -> {response.status}")
+        async with session.post(f"{base}{server.path}", data=b'not json',
+                                headers={SECRET_HEADER: SECRET}) as response:
+            print(f"malformed update -> {response.status}")
+
+        slots = asyncio.Semaphore(args.concurrency)
+        latencies = []
+
+        async def post(update_id: int):
+            async with slots:
+                start = time.perf_counter()
+                async with session.post(f"{base}{server.path}", json=synthetic_update(update_id),
+                                        headers={SECRET_HEADER: SECRET}) as response:
+                    assert response.status == 200, response.status
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(post(i) for i in range(1, args.updates + 1)))
+        accepted = time.perf_counter() - start
+        await asyncio.wait_for(api.all_sent.wait(), timeout=30)
+        replied = time.perf_counter() - start
+
+        async with session.get(f"{base}/health") as response:
+            print(f"health -> {response.status} {await response.json()}")
+
+    latencies.sort()
+    print(f"{args.updates} updates, {args.concurrency} concurrent connections")
+    print(f"accepted in {accepted:.2f}s ({args.updates / accepted:.0f}/s), "
+          f"POST p50 {latencies[len(latencies) // 2] * 1000:.1f}ms, p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f}ms")
+    print(f"all {api.sent} replies sent after {replied:.2f}s")
+
+    stop.set()
+    await serving
+    await api_runner.cleanup()
+
+if __name__ == '__main__':
+    asyncio.run(main())